@@ -0,0 +1,132 @@
+import os
+import json
+import time
+import shutil
+import tarfile
+import hashlib
+
+from typing import Dict, Iterator
+
+from database.snapshot import write_snapshot
+
+from utils import ARCHIVE_FORMAT_VERSION, ARCHIVE_COMPRESS_LEVEL, SNAPSHOTS_FOLDER
+
+ARCHIVE_HEADER = "archive.json"
+COPY_BUFFER_SIZE = 1024 ** 2
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def export_archive(database, archive_path: str) -> str:
+    """Writes the database as one gzip-compressed tar: a header with format
+    version and sha256 of every file, then the snapshot files (columnar
+    vectors, payloads, model, preparator and manifest)."""
+    staging = os.path.join(os.path.dirname(os.path.abspath(archive_path)), f".export-{os.getpid()}")
+    if os.path.exists(staging):
+        shutil.rmtree(staging)
+    os.makedirs(staging)
+    try:
+        write_snapshot(database, staging)
+        files = {
+            name: _file_digest(os.path.join(staging, name))
+            for name in _list_files(staging)
+        }
+        header = {"format_version": ARCHIVE_FORMAT_VERSION, "created": time.time(), "files": files}
+        with open(os.path.join(staging, ARCHIVE_HEADER), "w", encoding="utf-8") as file:
+            json.dump(header, file)
+
+        tmp_path = archive_path + ".tmp"
+        with tarfile.open(tmp_path, mode="w:gz", compresslevel=ARCHIVE_COMPRESS_LEVEL) as archive:
+            # The header goes first, so import can verify members while streaming
+            archive.add(os.path.join(staging, ARCHIVE_HEADER), arcname=ARCHIVE_HEADER)
+            for name in files:
+                archive.add(os.path.join(staging, name), arcname=name)
+        os.replace(tmp_path, archive_path)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return archive_path
+
+
+def unpack_archive(archive_path: str, path: str) -> Dict:
+    """Extracts the archive into an empty folder in one sequential pass,
+    checks version and checksums and returns the snapshot manifest."""
+    with tarfile.open(archive_path, mode="r:gz") as archive:
+        member = archive.next()
+        if member is None or member.name != ARCHIVE_HEADER:
+            raise ArchiveError(f"'{archive_path}' is not a database archive")
+        header = json.load(archive.extractfile(member))
+        if header.get("format_version", 0) > ARCHIVE_FORMAT_VERSION:
+            raise ArchiveError(
+                f"Archive format {header['format_version']} is newer than supported {ARCHIVE_FORMAT_VERSION}"
+            )
+
+        expected = header["files"]
+        seen = set()
+        # Iterating the archive starts over from the first member, the header included
+        for member in archive:
+            if not member.isfile() or member.name == ARCHIVE_HEADER:
+                continue
+            name = os.path.normpath(member.name)
+            if member.name not in expected or os.path.isabs(name) or name.startswith(".."):
+                raise ArchiveError(f"Unexpected archive member '{member.name}'")
+            target = os.path.join(path, member.name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            digest = hashlib.sha256()
+            source = archive.extractfile(member)
+            with open(target, "wb") as file:
+                for block in iter(lambda: source.read(COPY_BUFFER_SIZE), b""):
+                    digest.update(block)
+                    file.write(block)
+            if digest.hexdigest() != expected[member.name]:
+                raise ArchiveError(f"Checksum mismatch for '{member.name}'")
+            seen.add(member.name)
+
+    missing = set(expected) - seen
+    if missing:
+        raise ArchiveError(f"Archive is truncated, missing: {', '.join(sorted(missing))}")
+    with open(os.path.join(path, "manifest.json"), "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def install_state(path: str, database_path: str) -> None:
+    # Model files and pickles are moved where QdrantDatabase.load expects them.
+    # State left by the replaced database (journals, shard map, tombstones)
+    # goes first, published snapshots stay for replicas still reading them
+    os.makedirs(database_path, exist_ok=True)
+    for name in os.listdir(database_path):
+        if name != SNAPSHOTS_FOLDER:
+            _remove(os.path.join(database_path, name))
+    model_path = os.path.join(path, "model")
+    for name in os.listdir(model_path):
+        _move(os.path.join(model_path, name), os.path.join(database_path, name))
+    for name in ("json_preparator.bin", "minhash.bin", "typeahead.bin", "unfitted.json"):
+        if os.path.exists(os.path.join(path, name)):
+            _move(os.path.join(path, name), os.path.join(database_path, name))
+
+
+def _move(source: str, target: str) -> None:
+    _remove(target)
+    shutil.move(source, target)
+
+
+def _remove(path: str) -> None:
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def _list_files(path: str) -> Iterator[str]:
+    for folder, _, names in os.walk(path):
+        for name in sorted(names):
+            yield os.path.relpath(os.path.join(folder, name), path).replace(os.sep, "/")
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(COPY_BUFFER_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
@@ -1,18 +1,53 @@
 from pathlib import Path
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 
-from utils import InfoObject, InfoDocumentObject, VectorInfoObject, LemmaInfoObject
+from utils import (
+    InfoObject,
+    InfoDocumentObject,
+    VectorBatch,
+    LemmaInfoObject,
+    CHECKPOINT_CHUNK_SIZE,
+    PIPELINE_CHUNK_SIZE,
+)
 from preprocessor.lemmatizer import Lemmatizer
 from preprocessor.json_preparator import BaseJsonPreparator, JsonPreparator, FAQJsonPreparator
 from embedder.base import BaseVectorizer
+from database.checkpoint import BuildCheckpoint
+from database.pipeline import Pipeline, StageStats
 from database.qdrant import QdrantDatabase, FAQQdrantDatabase
 
-from typing import Union, List, Dict, Tuple
+from typing import Callable, Union, List, Dict, Tuple, Optional
+
+_worker_lemmatizer: Optional[Lemmatizer] = None
+
+
+def _lemmatize_texts(texts: List[str]) -> List[List[str]]:
+    # Runs in lemmatization worker processes, each loads its own dictionaries once
+    global _worker_lemmatizer
+    if _worker_lemmatizer is None:
+        _worker_lemmatizer = Lemmatizer()
+    return [_worker_lemmatizer.process(text=text) for text in texts]
 
 
 class QdrantDatabaseBuilder:
-    def __init__(self, index: QdrantDatabase) -> None:
-        self._lemmatizer = Lemmatizer()
+    """Builds databases in two pipelined phases: lemmatization overlapped with
+    checkpoint writes, then (after fitting the model) vectorization of every
+    collection overlapped with upserts. Per-stage utilization of the last build
+    is kept in pipeline_stats."""
+
+    def __init__(
+        self,
+        index: QdrantDatabase,
+        lemmatizer: Optional[Lemmatizer] = None,
+        lemmatize_workers: int = 1,
+    ) -> None:
+        self._lemmatizer = lemmatizer if lemmatizer is not None else Lemmatizer()
         self._index = index
+        self._lemmatize_workers = lemmatize_workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.pipeline_stats: Dict[str, StageStats] = {}
 
     def build_database(
         self,
@@ -22,28 +57,56 @@ class QdrantDatabaseBuilder:
         content_field: str,
         collection_name: str,
         model: BaseVectorizer,
+        resume: bool = True,
+        shard_count: int = 1,
+        shard_strategy: str = "hash",
+        metadata_fields: Optional[Dict[str, str]] = None,
     ) -> QdrantDatabase:
-        json_preparator = JsonPreparator(id_field=id_field, content_field=content_field)
+        json_preparator = JsonPreparator(
+            id_field=id_field,
+            content_field=content_field,
+            metadata_fields=metadata_fields,
+        )
         info_objects = json_preparator.convert_json(json_items)
-        lemmatized_documents = self._lemmatize_documents(info_objects)
-        
+        checkpoint = self._get_checkpoint(
+            name=name,
+            info_objects=info_objects,
+            params=(
+                collection_name,
+                type(model).__name__,
+                model.params,
+                shard_count,
+                shard_strategy,
+                json_preparator.metadata_fields,
+            ),
+            resume=resume,
+        )
+        self.pipeline_stats = {}
+        lemmatized_documents = self._lemmatize_documents(info_objects, checkpoint=checkpoint)
+
         model = self._train_model(
             model=model,
             lemmatized_documents=lemmatized_documents,
-        )
-        
-        documents_vectors = self._prepare_vectors(
-            lemmatized_items=lemmatized_documents,
-            model=model,
+            checkpoint=checkpoint,
         )
 
-        self.database = QdrantDatabase(name=name, index=self._index, model=model)
-        self.database.init_vectors(
-            collection_name=collection_name,
-            vectors=documents_vectors,
+        self.database = QdrantDatabase(
+            name=name,
+            index=self._index,
+            model=model,
+            lemmatizer=self._lemmatizer,
+            shard_count=shard_count,
+            shard_strategy=shard_strategy,
         )
+        # Collections get payload indexes for the preparator's metadata fields
         self.database._set_json_preparator(preparator=json_preparator)
+        self._upload_collections(
+            collections=[(collection_name, lemmatized_documents)],
+            model=model,
+            checkpoint=checkpoint,
+        )
         self.database.save()
+        checkpoint.clear()
         return self.database
 
     def build_faq_database(
@@ -56,28 +119,43 @@ class QdrantDatabaseBuilder:
         questions_collection_name: str,
         answers_collection_name: str,
         model: BaseVectorizer,
+        resume: bool = True,
+        fusion: str = "max",
+        question_weight: float = 0.5,
+        cache_answers: bool = True,
+        shard_count: int = 1,
+        shard_strategy: str = "hash",
+        metadata_fields: Optional[Dict[str, str]] = None,
     ) -> FAQQdrantDatabase:
         json_preparator = FAQJsonPreparator(
             id_field=id_field,
             question_field=question_field,
             answer_field=answer_field,
+            metadata_fields=metadata_fields,
         )
         info_objects = json_preparator.convert_json(faq_json)
-           
-        lemmatized_questions, lemmatized_answers = self._lemmatize_faq(info_objects)
-        
+        checkpoint = self._get_checkpoint(
+            name=name,
+            info_objects=info_objects,
+            params=(
+                questions_collection_name,
+                answers_collection_name,
+                type(model).__name__,
+                model.params,
+                shard_count,
+                shard_strategy,
+                json_preparator.metadata_fields,
+            ),
+            resume=resume,
+        )
+
+        self.pipeline_stats = {}
+        lemmatized_questions, lemmatized_answers = self._lemmatize_faq(info_objects, checkpoint=checkpoint)
+
         model = self._train_model(
             model=model,
             lemmatized_documents=lemmatized_questions + lemmatized_answers,
-        )
-        
-        questions_vectors = self._prepare_vectors(
-            lemmatized_items=lemmatized_questions,
-            model=model,
-        )
-        answers_vectors = self._prepare_vectors(
-            lemmatized_items=lemmatized_answers,
-            model=model,
+            checkpoint=checkpoint,
         )
 
         self.database = FAQQdrantDatabase(
@@ -86,48 +164,144 @@ class QdrantDatabaseBuilder:
             model=model,
             questions_collection_name=questions_collection_name,
             answers_collection_name=answers_collection_name,
+            lemmatizer=self._lemmatizer,
+            fusion=fusion,
+            question_weight=question_weight,
+            cache_answers=cache_answers,
+            shard_count=shard_count,
+            shard_strategy=shard_strategy,
         )
-        self.database.init_vectors(collection_name=questions_collection_name, vectors=questions_vectors)
-        self.database.init_vectors(collection_name=answers_collection_name, vectors=answers_vectors)
         self.database._set_json_preparator(preparator=json_preparator)
+        self._upload_collections(
+            collections=[
+                (questions_collection_name, lemmatized_questions),
+                (answers_collection_name, lemmatized_answers),
+            ],
+            model=model,
+            checkpoint=checkpoint,
+        )
+        self.database._build_typeahead(
+            ids=[item.id for item in lemmatized_questions],
+            questions=[item.content for item in lemmatized_questions],
+            lemmatized_questions=self._get_corpus(lemmatized_questions),
+        )
         self.database.save()
+        self.database._fill_answers_cache()
+        checkpoint.clear()
         return self.database
-    
-    def _lemmatize_faq(self, info_objects: List[InfoObject]) -> Tuple[List[LemmaInfoObject]]:
+
+    def _get_checkpoint(
+        self,
+        name: str,
+        info_objects: List[Union[InfoObject, InfoDocumentObject]],
+        params: Tuple,
+        resume: bool,
+    ) -> BuildCheckpoint:
+        checkpoint = BuildCheckpoint(
+            path=os.path.join(self._index._client.location, name),
+            fingerprint=BuildCheckpoint.fingerprint(info_objects, *params),
+        )
+        if not resume:
+            checkpoint.reset()
+        return checkpoint
+
+    def _lemmatize_faq(
+        self,
+        info_objects: List[InfoObject],
+        checkpoint: BuildCheckpoint,
+    ) -> Tuple[List[LemmaInfoObject], List[LemmaInfoObject]]:
+        def lemmatize_chunk(items: List[InfoObject]) -> Tuple[List[LemmaInfoObject], List[LemmaInfoObject]]:
+            lemmas = self._lemmatize_texts([item.question for item in items] + [item.answer for item in items])
+            questions = [
+                LemmaInfoObject(id=item.id, content=item.question, lemmas=item_lemmas, metadata=item.metadata)
+                for item, item_lemmas in zip(items, lemmas[:len(items)])
+            ]
+            answers = [
+                LemmaInfoObject(id=item.id, content=item.answer, lemmas=item_lemmas, metadata=item.metadata)
+                for item, item_lemmas in zip(items, lemmas[len(items):])
+            ]
+            return questions, answers
+
         lemmatized_questions: List[LemmaInfoObject] = []
         lemmatized_answers: List[LemmaInfoObject] = []
-        for item in info_objects:
-            lemmatized_question = self._lemmatizer.process(text=item.question)
-            lemmatized_answer = self._lemmatizer.process(text=item.answer)
-            lemmatized_questions.append(
-                LemmaInfoObject(
-                    id=item.id,
-                    content=item.question,
-                    lemmas=lemmatized_question
-                )
-            )
-            lemmatized_answers.append(
-                LemmaInfoObject(
-                    id=item.id,
-                    content=item.answer,
-                    lemmas=lemmatized_answer
-                )
-            )
+        for questions, answers in self._run_lemmatization(info_objects, lemmatize_chunk, checkpoint):
+            lemmatized_questions.extend(questions)
+            lemmatized_answers.extend(answers)
         return lemmatized_questions, lemmatized_answers
 
-    def _lemmatize_documents(self, info_objects: List[InfoDocumentObject]) -> List[LemmaInfoObject]:
+    def _lemmatize_documents(
+        self,
+        info_objects: List[InfoDocumentObject],
+        checkpoint: BuildCheckpoint,
+    ) -> List[LemmaInfoObject]:
+        def lemmatize_chunk(items: List[InfoDocumentObject]) -> List[LemmaInfoObject]:
+            lemmas = self._lemmatize_texts([item.content for item in items])
+            return [
+                LemmaInfoObject(id=item.id, content=item.content, lemmas=item_lemmas, metadata=item.metadata)
+                for item, item_lemmas in zip(items, lemmas)
+            ]
+
         lemmatized_documents: List[LemmaInfoObject] = []
-        for item in info_objects:
-            lemmatized_document = self._lemmatizer.process(text=item.content)
-            lemmatized_documents.append(
-                LemmaInfoObject(
-                    id=item.id,
-                    content=item.content,
-                    lemmas=lemmatized_document
+        for documents in self._run_lemmatization(info_objects, lemmatize_chunk, checkpoint):
+            lemmatized_documents.extend(documents)
+        return lemmatized_documents
+
+    def _run_lemmatization(
+        self,
+        info_objects: List,
+        lemmatize_chunk: Callable[[List], object],
+        checkpoint: BuildCheckpoint,
+    ) -> List:
+        offsets = range(0, len(info_objects), CHECKPOINT_CHUNK_SIZE)
+        chunks: Dict[int, object] = {}
+
+        def lemmatize(job: Tuple[int, List]) -> Tuple[int, object]:
+            chunk, items = job
+            return chunk, lemmatize_chunk(items)
+
+        def save(job: Tuple[int, object]) -> None:
+            # Chunks arrive in order, so the checkpoint always covers a prefix of the input
+            chunk, lemmatized = job
+            checkpoint.save_chunk(chunk, lemmatized)
+            chunks[chunk] = lemmatized
+
+        pipeline = Pipeline()
+        to_lemmatize, to_save = pipeline.queue(), pipeline.queue()
+        pipeline.stage("lemmatize", lemmatize, inbox=to_lemmatize, outbox=to_save)
+        pipeline.stage("checkpoint", save, inbox=to_save)
+
+        self._pool = ProcessPoolExecutor(self._lemmatize_workers) if self._lemmatize_workers > 1 else None
+        try:
+            self.pipeline_stats.update(
+                pipeline.run(
+                    sources=[(
+                        to_lemmatize,
+                        (
+                            (chunk, info_objects[offset:offset + CHECKPOINT_CHUNK_SIZE])
+                            for chunk, offset in enumerate(offsets)
+                            if not checkpoint.has_chunk(chunk)
+                        ),
+                    )]
                 )
             )
-        return lemmatized_documents
-    
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown()
+            self._pool = None
+
+        return [
+            chunks[chunk] if chunk in chunks else checkpoint.load_chunk(chunk)
+            for chunk in range(len(offsets))
+        ]
+
+    def _lemmatize_texts(self, texts: List[str]) -> List[List[str]]:
+        if self._pool is None:
+            return [self._lemmatizer.process(text=text) for text in texts]
+
+        size = -(-len(texts) // self._lemmatize_workers)
+        parts = [texts[offset:offset + size] for offset in range(0, len(texts), size)]
+        return [lemmas for part in self._pool.map(_lemmatize_texts, parts) for lemmas in part]
+
     def _get_corpus(
         self,
         lemmatized_documents: List[LemmaInfoObject],
@@ -141,25 +315,85 @@ class QdrantDatabaseBuilder:
         self,
         model: BaseVectorizer,
         lemmatized_documents: List[LemmaInfoObject],
+        checkpoint: BuildCheckpoint,
     ) -> BaseVectorizer:
+        if checkpoint.model_fitted:
+            return checkpoint.load_model(model)
+
+        stats = StageStats("fit")
+        stats.started = time.perf_counter()
         lemmas_corpus = self._get_corpus(lemmatized_documents)
         model.fit(corpus=lemmas_corpus)
+        checkpoint.save_model(model)
+        stats.finished = time.perf_counter()
+        stats.busy = stats.wall
+        stats.items = len(lemmas_corpus)
+        self.pipeline_stats["fit"] = stats
         return model
-        
-    def _prepare_vectors(
+
+    def _upload_collections(
         self,
-        lemmatized_items: List[LemmaInfoObject],
+        collections: List[Tuple[str, List[LemmaInfoObject]]],
         model: BaseVectorizer,
-    ) -> List[VectorInfoObject]:
-        item_vectors: List[VectorInfoObject] = []
-        for item in lemmatized_items:
-            vector = model.transform(item.lemmas)
-            item_vectors.append(
-                VectorInfoObject(
-                    id=item.id,
-                    content=item.content,
-                    vector=vector,
-                )
+        checkpoint: BuildCheckpoint,
+    ) -> None:
+        # Every collection has its own vectorize stage, all of them feed one
+        # upsert sink, which runs in this thread: the embedded index client
+        # can't be used from the threads of other stages
+        def vectorize(job: Tuple[str, int, List[LemmaInfoObject]]) -> Tuple[str, int, VectorBatch]:
+            collection_name, offset, items = job
+            return collection_name, offset + len(items), self._prepare_vectors(lemmatized_items=items, model=model)
+
+        def upsert(job: Tuple[str, int, VectorBatch]) -> None:
+            # Upserts by id are idempotent, so a chunk interrupted halfway is simply sent again
+            collection_name, upserted, vectors = job
+            self.database._add_vectors(items=vectors, collection_name=collection_name)
+            checkpoint.set_upserted(collection_name, upserted)
+
+        pipeline = Pipeline()
+        to_upsert = pipeline.queue()
+        sources = []
+        for collection_name, items in collections:
+            if not checkpoint.is_created(collection_name):
+                self.database._create_collection(collection_name=collection_name, embedding_size=model.embedding_size)
+                checkpoint.set_upserted(collection_name, 0)
+            # Replaying placement of already upserted points in order restores
+            # size-balanced shard owners of a resumed build
+            self.database._shards.assign(
+                collection_name,
+                [item.id for item in items[:checkpoint.upserted(collection_name)]],
             )
-        return item_vectors
 
+            to_vectorize = pipeline.queue()
+            pipeline.stage(f"vectorize:{collection_name}", vectorize, inbox=to_vectorize, outbox=to_upsert)
+            sources.append((
+                to_vectorize,
+                [
+                    (collection_name, offset, items[offset:offset + PIPELINE_CHUNK_SIZE])
+                    for offset in range(checkpoint.upserted(collection_name), len(items), PIPELINE_CHUNK_SIZE)
+                ],
+            ))
+        pipeline.sink("upsert", upsert, inbox=to_upsert, producers=len(collections))
+        self.pipeline_stats.update(pipeline.run(sources=sources))
+
+        for collection_name, items in collections:
+            if collection_name == self.database._duplicates_collection:
+                self.database._build_minhash(
+                    ids=[item.id for item in items],
+                    lemmatized_documents=self._get_corpus(items),
+                )
+
+    def _prepare_vectors(
+        self,
+        lemmatized_items: List[LemmaInfoObject],
+        model: BaseVectorizer,
+    ) -> VectorBatch:
+        if not lemmatized_items:
+            return VectorBatch.empty(model.embedding_size)
+        return VectorBatch(
+            ids=[item.id for item in lemmatized_items],
+            contents=[item.content for item in lemmatized_items],
+            vectors=model.transform_batch(self._get_corpus(lemmatized_items)),
+            lemmas=[item.lemmas for item in lemmatized_items],
+            metadata=[item.metadata for item in lemmatized_items],
+        )
@@ -0,0 +1,110 @@
+import os
+import json
+import pickle
+import shutil
+import hashlib
+
+from typing import Any, Dict, Iterable, List
+
+from embedder.base import BaseVectorizer
+
+
+class BuildCheckpoint:
+    """Build progress of one database kept next to it in <database path>.checkpoint.
+
+    Lemmatized chunks, the fitted model and the number of points upserted into
+    every collection are persisted as soon as they are produced. A build started
+    again over the same input (same fingerprint) continues from the last saved step.
+    """
+
+    def __init__(self, path: str, fingerprint: str) -> None:
+        # Outside of the database folder, whose existence means a finished build
+        self._path = os.path.normpath(path) + ".checkpoint"
+        self._fingerprint = fingerprint
+        self._state = self._read_state()
+
+    @staticmethod
+    def fingerprint(items: Iterable[Any], *params: Any) -> str:
+        digest = hashlib.sha1(json.dumps(params, default=str).encode("utf-8"))
+        for item in items:
+            digest.update(repr(tuple(item)).encode("utf-8"))
+        return digest.hexdigest()
+
+    def reset(self) -> None:
+        self.clear()
+        self._state = self._empty_state()
+
+    def clear(self) -> None:
+        if os.path.exists(self._path):
+            shutil.rmtree(self._path)
+
+    def has_chunk(self, chunk: int) -> bool:
+        return chunk < self._state["chunks"]
+
+    def load_chunk(self, chunk: int) -> List:
+        with open(self._chunk_path(chunk), "rb") as file:
+            return pickle.load(file)
+
+    def save_chunk(self, chunk: int, items: List) -> None:
+        self._ensure_dir()
+        with open(self._chunk_path(chunk), "wb") as file:
+            pickle.dump(items, file)
+        self._state["chunks"] = chunk + 1
+        self._write_state()
+
+    @property
+    def model_fitted(self) -> bool:
+        return self._state["model_fitted"]
+
+    def load_model(self, model: BaseVectorizer) -> BaseVectorizer:
+        model.load(self._path)
+        return model
+
+    def save_model(self, model: BaseVectorizer) -> None:
+        self._ensure_dir()
+        model.save(self._path)
+        self._state["model_fitted"] = True
+        self._write_state()
+
+    def is_created(self, collection_name: str) -> bool:
+        return collection_name in self._state["upserted"]
+
+    def upserted(self, collection_name: str) -> int:
+        return self._state["upserted"].get(collection_name, 0)
+
+    def set_upserted(self, collection_name: str, count: int) -> None:
+        self._ensure_dir()
+        self._state["upserted"][collection_name] = count
+        self._write_state()
+
+    def _empty_state(self) -> Dict:
+        return {
+            "fingerprint": self._fingerprint,
+            "chunks": 0,
+            "model_fitted": False,
+            "upserted": {},
+        }
+
+    def _read_state(self) -> Dict:
+        state_path = os.path.join(self._path, "state.json")
+        if os.path.exists(state_path):
+            with open(state_path, "r", encoding="utf-8") as file:
+                state = json.load(file)
+            if state.get("fingerprint") == self._fingerprint:
+                return state
+            # Input changed since the interrupted build, its progress is useless
+            self.clear()
+        return self._empty_state()
+
+    def _write_state(self) -> None:
+        state_path = os.path.join(self._path, "state.json")
+        with open(state_path + ".tmp", "w", encoding="utf-8") as file:
+            json.dump(self._state, file)
+        os.replace(state_path + ".tmp", state_path)
+
+    def _chunk_path(self, chunk: int) -> str:
+        return os.path.join(self._path, f"lemmas_{chunk:06d}.bin")
+
+    def _ensure_dir(self) -> None:
+        if not os.path.exists(self._path):
+            os.makedirs(self._path)
@@ -0,0 +1,199 @@
+import os
+import json
+
+import numpy as np
+
+from typing import Any, Dict, List, Optional, Union
+
+from database.filters import Conditions, RANGE_KEYS, payload_matches
+
+from utils import VECTOR_DTYPE
+
+PointId = Union[int, str]
+
+# Floats hold integers exactly up to here, larger ones are stored as keywords
+MAX_EXACT_INT = 2 ** 53
+COMPARISONS = {
+    "gt": np.greater,
+    "gte": np.greater_equal,
+    "lt": np.less,
+    "lte": np.less_equal,
+}
+
+
+def write_columns(
+    path: str,
+    collection_name: str,
+    ids: List[PointId],
+    vectors: np.ndarray,
+    payloads: List[Dict],
+) -> None:
+    """Writes points of a collection as <collection>.vectors.npy, ids with
+    their sort order, contents as one UTF-8 blob with offsets and one column
+    per metadata field, described in <collection>.columns.json."""
+    prefix = os.path.join(path, collection_name)
+    np.save(prefix + ".vectors.npy", np.asarray(vectors, dtype=VECTOR_DTYPE))
+
+    if all(isinstance(item_id, int) for item_id in ids):
+        id_column = np.array(ids, dtype=np.int64)
+    else:
+        id_column = np.array([str(item_id) for item_id in ids], dtype=np.str_)
+    np.save(prefix + ".ids.npy", id_column)
+    np.save(prefix + ".ids.order.npy", np.argsort(id_column, kind="stable").astype(np.int64))
+
+    contents = [(payload.get("content") or "").encode("utf-8") for payload in payloads]
+    offsets = np.zeros(len(contents) + 1, dtype=np.int64)
+    np.cumsum([len(content) for content in contents], out=offsets[1:])
+    np.save(prefix + ".content.offsets.npy", offsets)
+    with open(prefix + ".content.bin", "wb") as file:
+        file.write(b"".join(contents))
+
+    names = sorted({name for payload in payloads for name in payload if name != "content"})
+    fields = []
+    for position, name in enumerate(names):
+        values = [payload.get(name) for payload in payloads]
+        column_path = f"{prefix}.field{position}.npy"
+        if _is_numeric(values):
+            np.save(column_path, np.array([np.nan if value is None else value for value in values], dtype=np.float64))
+            kind = "int" if all(isinstance(value, int) for value in values if value is not None) else "float"
+            fields.append({"name": name, "kind": kind})
+        else:
+            # Distinct values once in the description, rows are codes into them
+            codes: Dict[str, int] = {}
+            distinct = []
+            column = np.full(len(values), -1, dtype=np.int32)
+            for row, value in enumerate(values):
+                if value is None:
+                    continue
+                key = json.dumps(value, sort_keys=True, ensure_ascii=False)
+                if key not in codes:
+                    codes[key] = len(distinct)
+                    distinct.append(value)
+                column[row] = codes[key]
+            np.save(column_path, column)
+            fields.append({"name": name, "kind": "keyword", "values": distinct})
+
+    with open(prefix + ".columns.json", "w", encoding="utf-8") as file:
+        json.dump({"count": len(ids), "fields": fields}, file, ensure_ascii=False)
+
+
+class ColumnStore:
+    """Points of one collection written by write_columns, memory mapped.
+
+    Processes serving the same snapshot share vectors, ids, contents and
+    metadata through the page cache instead of each parsing its own copy.
+    Payloads are decoded only for returned hits and filters are evaluated on
+    whole columns.
+    """
+
+    def __init__(self, path: str, collection_name: str) -> None:
+        prefix = os.path.join(path, collection_name)
+        with open(prefix + ".columns.json", "r", encoding="utf-8") as file:
+            description = json.load(file)
+        self._fields: List[Dict[str, Any]] = description["fields"]
+        self.vectors = np.load(prefix + ".vectors.npy", mmap_mode="r")
+        self.ids = np.load(prefix + ".ids.npy", mmap_mode="r")
+        self._order = np.load(prefix + ".ids.order.npy", mmap_mode="r")
+        self._offsets = np.load(prefix + ".content.offsets.npy", mmap_mode="r")
+        # An empty file can't be mapped
+        if os.path.getsize(prefix + ".content.bin"):
+            self._content = np.memmap(prefix + ".content.bin", dtype=np.uint8, mode="r")
+        else:
+            self._content = np.zeros(0, dtype=np.uint8)
+        self._columns = [
+            np.load(f"{prefix}.field{position}.npy", mmap_mode="r")
+            for position in range(len(self._fields))
+        ]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def id_at(self, position: int) -> PointId:
+        return self.ids[position].item()
+
+    def position(self, item_id: PointId) -> Optional[int]:
+        if (self.ids.dtype.kind == "U") != isinstance(item_id, str):
+            return None
+        ids = self.ids
+        order = self._order
+        low, high = 0, len(order)
+        # Binary search over ids in sort order, without materializing them
+        while low < high:
+            middle = (low + high) // 2
+            if ids[order[middle]] < item_id:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(order) and ids[order[low]] == item_id:
+            return int(order[low])
+        return None
+
+    def content(self, position: int) -> str:
+        return self._content[self._offsets[position]:self._offsets[position + 1]].tobytes().decode("utf-8")
+
+    def payload(self, position: int) -> Dict:
+        payload = {}
+        for field, column in zip(self._fields, self._columns):
+            value = column[position]
+            if field["kind"] == "keyword":
+                if value >= 0:
+                    payload[field["name"]] = field["values"][value]
+            elif not np.isnan(value):
+                payload[field["name"]] = int(value) if field["kind"] == "int" else float(value)
+        payload["content"] = self.content(position)
+        return payload
+
+    def mask(self, conditions: Conditions) -> np.ndarray:
+        # Same dialect and results as payload_matches, one column at a time
+        allowed = np.ones(len(self), dtype=bool)
+        fields = {field["name"]: (field, column) for field, column in zip(self._fields, self._columns)}
+        for name, condition in conditions.items():
+            if name in fields:
+                allowed &= self._match(*fields[name], condition)
+            elif name == "content":
+                allowed &= np.array(
+                    [payload_matches({"content": self.content(i)}, {name: condition}) for i in range(len(self))],
+                    dtype=bool,
+                )
+            elif not payload_matches({}, {name: condition}):
+                allowed[:] = False
+        return allowed
+
+    @staticmethod
+    def _match(field: Dict, column: np.ndarray, condition: Any) -> np.ndarray:
+        name = field["name"]
+        if field["kind"] == "keyword":
+            codes = [code for code, value in enumerate(field["values"]) if payload_matches({name: value}, {name: condition})]
+            matched = np.isin(column, codes)
+            if payload_matches({}, {name: condition}):
+                matched |= column < 0
+            return matched
+
+        missing = np.isnan(column)
+        if isinstance(condition, dict):
+            matched = ~missing
+            for operator, bound in condition.items():
+                if operator not in RANGE_KEYS:
+                    raise ValueError(f"Unknown range operator '{operator}'")
+                matched &= COMPARISONS[operator](column, bound)
+            return matched
+        if isinstance(condition, (list, tuple, set)):
+            matched = np.isin(column, [value for value in condition if _is_number(value)])
+            return matched | missing if None in condition else matched
+        if condition is None:
+            return missing
+        if _is_number(condition):
+            return column == condition
+        return np.zeros(len(column), dtype=bool)
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _is_numeric(values: List[Any]) -> bool:
+    present = [value for value in values if value is not None]
+    return bool(present) and all(
+        _is_number(value) and (isinstance(value, float) or abs(value) < MAX_EXACT_INT)
+        for value in present
+    )
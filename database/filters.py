@@ -0,0 +1,64 @@
+from typing import Any, Dict, List, Optional, Union
+
+from qdrant_client.http.models import FieldCondition, Filter, HasIdCondition, MatchAny, MatchValue, Range
+
+Conditions = Dict[str, Any]
+
+RANGE_KEYS = ("gt", "gte", "lt", "lte")
+
+
+def build_filter(conditions: Optional[Union[Conditions, Filter]]) -> Optional[Filter]:
+    """Turns {"lang": "ru", "product": ["a", "b"], "year": {"gte": 2020}} into
+    a Filter of must conditions: equality, any of a list or a range.
+    Filter objects are passed through as is."""
+    if conditions is None or isinstance(conditions, Filter):
+        return conditions
+    must = []
+    for key, value in conditions.items():
+        if isinstance(value, dict):
+            must.append(FieldCondition(key=key, range=Range(**value)))
+        elif isinstance(value, (list, tuple, set)):
+            must.append(FieldCondition(key=key, match=MatchAny(any=list(value))))
+        else:
+            must.append(FieldCondition(key=key, match=MatchValue(value=value)))
+    return Filter(must=must)
+
+
+def restrict_ids(query_filter: Optional[Filter], ids: List) -> Filter:
+    condition = HasIdCondition(has_id=ids)
+    if query_filter is None:
+        return Filter(must=[condition])
+    return Filter(must=[condition, query_filter])
+
+
+def exclude_ids(query_filter: Optional[Filter], ids: List) -> Filter:
+    condition = HasIdCondition(has_id=ids)
+    if query_filter is None:
+        return Filter(must_not=[condition])
+    return Filter(must=[query_filter], must_not=[condition])
+
+
+def payload_matches(payload: Dict, conditions: Conditions) -> bool:
+    # The same condition dialect evaluated in memory, for read-only replicas
+    for key, value in conditions.items():
+        field = payload.get(key)
+        if isinstance(value, dict):
+            if field is None:
+                return False
+            for operator, bound in value.items():
+                if operator not in RANGE_KEYS:
+                    raise ValueError(f"Unknown range operator '{operator}'")
+                if operator == "gt" and not field > bound:
+                    return False
+                if operator == "gte" and not field >= bound:
+                    return False
+                if operator == "lt" and not field < bound:
+                    return False
+                if operator == "lte" and not field <= bound:
+                    return False
+        elif isinstance(value, (list, tuple, set)):
+            if field not in value:
+                return False
+        elif field != value:
+            return False
+    return True
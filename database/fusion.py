@@ -0,0 +1,39 @@
+from collections import defaultdict
+
+from typing import Dict, List, Sequence, Tuple, Union
+
+from qdrant_client.http.models import ScoredPoint
+
+from utils import RRF_K
+
+FUSION_METHODS = ("max", "weighted", "rrf")
+
+
+def fuse_scores(
+    results: Sequence[List[ScoredPoint]],
+    weights: Sequence[float],
+    method: str = "max",
+    rrf_k: int = RRF_K,
+) -> List[Tuple[Union[int, str], float]]:
+    """Merges hits of several collections into (id, score) pairs sorted by
+    fused score, every id occurs once.
+
+    max      - best score of the id over all collections
+    weighted - sum of scores multiplied by collection weights
+    rrf      - reciprocal rank fusion, sum of weight / (rrf_k + rank)
+    """
+    if method not in FUSION_METHODS:
+        raise ValueError(f"Unknown fusion method '{method}', expected one of {FUSION_METHODS}")
+
+    fused: Dict[Union[int, str], float] = defaultdict(float) if method != "max" else {}
+    for hits, weight in zip(results, weights):
+        for rank, hit in enumerate(hits, start=1):
+            if method == "max":
+                if hit.score > fused.get(hit.id, float("-inf")):
+                    fused[hit.id] = hit.score
+            elif method == "weighted":
+                fused[hit.id] += weight * hit.score
+            else:
+                fused[hit.id] += weight / (rrf_k + rank)
+    # Ties keep the order in which ids were first seen
+    return sorted(fused.items(), key=lambda item: -item[1])
@@ -0,0 +1,209 @@
+import os
+import pickle
+import zlib
+from collections import defaultdict
+from itertools import combinations
+
+import numpy as np
+
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from utils import MINHASH_PERMUTATIONS, MINHASH_BANDS, SHINGLE_SIZE
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+class MinHashIndex:
+    """MinHash signatures of lemma shingles with LSH banding.
+
+    Documents whose shingle sets have a high Jaccard similarity land in a common
+    bucket in at least one band, so near-duplicate candidates are found without
+    comparing every pair of vectors. Shingles are single lemmas by default, so
+    like TF-IDF vectors they ignore word order.
+
+    Once attached to a folder, every change is appended to minhash.journal
+    there; load() replays it over the last full save().
+    """
+
+    def __init__(
+        self,
+        num_perm: int = MINHASH_PERMUTATIONS,
+        bands: int = MINHASH_BANDS,
+        shingle_size: int = SHINGLE_SIZE,
+        seed: int = 1,
+    ) -> None:
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self._num_perm = num_perm
+        self._bands = bands
+        self._rows = num_perm // bands
+        self._shingle_size = shingle_size
+
+        generator = np.random.RandomState(seed)
+        self._a = generator.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = generator.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+        self._signatures: Dict[int, np.ndarray] = {}
+        self._buckets: List[Dict[bytes, Set[int]]] = [defaultdict(set) for _ in range(bands)]
+        self._journal: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def __contains__(self, item_id: int) -> bool:
+        return item_id in self._signatures
+
+    @property
+    def shingle_size(self) -> int:
+        return self._shingle_size
+
+    def shingles(self, lemmas: List[str]) -> Set[str]:
+        size = self._shingle_size
+        if len(lemmas) < size:
+            return {" ".join(lemmas)} if lemmas else set()
+        return {" ".join(lemmas[i:i + size]) for i in range(len(lemmas) - size + 1)}
+
+    def signature(self, lemmas: List[str]) -> Optional[np.ndarray]:
+        shingles = self.shingles(lemmas)
+        if not shingles:
+            return None
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles),
+            dtype=np.uint64,
+            count=len(shingles),
+        )
+        permuted = (np.outer(hashes, self._a) + self._b) % MERSENNE_PRIME & MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def add(self, item_id: int, lemmas: List[str]) -> None:
+        signature = self.signature(lemmas)
+        self._insert(item_id, signature)
+        self._log(("add", item_id, signature))
+
+    def remove(self, item_id: int) -> bool:
+        removed = self._remove(item_id)
+        if removed:
+            self._log(("remove", item_id))
+        return removed
+
+    def query(self, lemmas: List[str]) -> Set[int]:
+        signature = self.signature(lemmas)
+        if signature is None:
+            return set()
+        return self._lookup(signature)
+
+    def candidates(self, item_id: int) -> Set[int]:
+        signature = self._signatures.get(item_id)
+        if signature is None:
+            return set()
+        return self._lookup(signature) - {item_id}
+
+    def candidate_pairs(self) -> Set[Tuple[int, int]]:
+        pairs: Set[Tuple[int, int]] = set()
+        for buckets in self._buckets:
+            for ids in buckets.values():
+                if len(ids) > 1:
+                    pairs.update(combinations(sorted(ids), 2))
+        return pairs
+
+    def attach(self, path: str) -> None:
+        self._journal = os.path.join(path, "minhash.journal")
+
+    def save(self, path: str) -> None:
+        tmp_path = os.path.join(path, "minhash.bin.tmp")
+        with open(tmp_path, "wb") as file:
+            pickle.dump(self, file)
+        os.replace(tmp_path, os.path.join(path, "minhash.bin"))
+        # The full copy covers everything journaled in this folder so far
+        journal = os.path.join(path, "minhash.journal")
+        if journal == self._journal and os.path.exists(journal):
+            os.remove(journal)
+
+    @classmethod
+    def load(cls, path: str) -> "MinHashIndex":
+        with open(os.path.join(path, "minhash.bin"), "rb") as file:
+            obj = pickle.load(file)
+        journal = os.path.join(path, "minhash.journal")
+        if os.path.exists(journal):
+            with open(journal, "rb") as file:
+                while True:
+                    try:
+                        entry = pickle.load(file)
+                    except EOFError:
+                        break
+                    if entry[0] == "add":
+                        obj._insert(entry[1], entry[2])
+                    else:
+                        obj._remove(entry[1])
+        obj.attach(path)
+        return obj
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.exists(os.path.join(path, "minhash.bin"))
+
+    def __getstate__(self) -> Dict:
+        state = self.__dict__.copy()
+        state["_journal"] = None
+        return state
+
+    def __setstate__(self, state: Dict) -> None:
+        state.setdefault("_journal", None)
+        self.__dict__.update(state)
+
+    def _insert(self, item_id: int, signature: Optional[np.ndarray]) -> None:
+        self._remove(item_id)
+        if signature is None:
+            return
+        self._signatures[item_id] = signature
+        for band, key in enumerate(self._band_keys(signature)):
+            self._buckets[band][key].add(item_id)
+
+    def _remove(self, item_id: int) -> bool:
+        signature = self._signatures.pop(item_id, None)
+        if signature is None:
+            return False
+        for band, key in enumerate(self._band_keys(signature)):
+            bucket = self._buckets[band].get(key)
+            if bucket is not None:
+                bucket.discard(item_id)
+                if not bucket:
+                    del self._buckets[band][key]
+        return True
+
+    def _log(self, entry: Tuple) -> None:
+        if self._journal is not None:
+            with open(self._journal, "ab") as file:
+                pickle.dump(entry, file)
+
+    def _band_keys(self, signature: np.ndarray) -> Iterable[bytes]:
+        for band in range(self._bands):
+            yield signature[band * self._rows:(band + 1) * self._rows].tobytes()
+
+    def _lookup(self, signature: np.ndarray) -> Set[int]:
+        found: Set[int] = set()
+        for band, key in enumerate(self._band_keys(signature)):
+            found.update(self._buckets[band].get(key, ()))
+        return found
+
+
+def group_pairs(pairs: Iterable[Tuple[int, int]]) -> List[Set[int]]:
+    parents: Dict[int, int] = {}
+
+    def find(item: int) -> int:
+        parents.setdefault(item, item)
+        while parents[item] != item:
+            parents[item] = parents[parents[item]]
+            item = parents[item]
+        return item
+
+    for left, right in pairs:
+        left_root, right_root = find(left), find(right)
+        if left_root != right_root:
+            parents[right_root] = left_root
+
+    groups: Dict[int, Set[int]] = defaultdict(set)
+    for item in parents:
+        groups[find(item)].add(item)
+    return list(groups.values())
@@ -0,0 +1,169 @@
+import time
+import threading
+from queue import Queue
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from utils import PIPELINE_QUEUE_SIZE
+
+STOP = object()
+
+
+class StageStats:
+    __slots__ = ("name", "items", "busy", "started", "finished")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.items = 0
+        self.busy = 0.
+        self.started = 0.
+        self.finished = 0.
+
+    @property
+    def wall(self) -> float:
+        return max(self.finished - self.started, 0.)
+
+    @property
+    def utilization(self) -> float:
+        # Share of the stage lifetime spent working rather than waiting on queues
+        return self.busy / self.wall if self.wall else 0.
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "items": self.items,
+            "busy": self.busy,
+            "wall": self.wall,
+            "utilization": self.utilization,
+        }
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.name}: {self.items} items, busy {self.busy:.2f}s of {self.wall:.2f}s "
+            f"({100 * self.utilization:.0f}%)"
+        )
+
+
+class Stage(threading.Thread):
+    """Applies func to every item of inbox and puts results to outbox.
+
+    The stage stops after receiving STOP from each of its producers. If func
+    fails, the stage keeps draining inbox so that upstream stages never block
+    on a full queue, and the error is raised by Pipeline.run.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[Any], Any],
+        inbox: Queue,
+        outbox: Optional[Queue] = None,
+        producers: int = 1,
+    ) -> None:
+        super().__init__(name=name, daemon=True)
+        self._func = func
+        self._inbox = inbox
+        self._outbox = outbox
+        self._producers = producers
+        self.stats = StageStats(name)
+        self.error: Optional[BaseException] = None
+
+    def run(self) -> None:
+        self.stats.started = time.perf_counter()
+        stops = 0
+        while stops < self._producers:
+            item = self._inbox.get()
+            if item is STOP:
+                stops += 1
+                continue
+            if self.error is not None:
+                continue
+
+            started = time.perf_counter()
+            try:
+                result = self._func(item)
+            except BaseException as error:
+                self.error = error
+                continue
+            self.stats.busy += time.perf_counter() - started
+            self.stats.items += 1
+            if self._outbox is not None:
+                self._outbox.put(result)
+
+        self.stats.finished = time.perf_counter()
+        if self._outbox is not None:
+            self._outbox.put(STOP)
+
+
+class Pipeline:
+    """Producer/consumer stages connected by bounded queues.
+
+    Stages run in their own threads, except for an optional sink, which
+    Pipeline.run drives in the calling thread. Work that is bound to the
+    caller's thread (e.g. writes through the embedded index client, whose
+    SQLite connection can't be shared between threads) goes to the sink.
+    """
+
+    def __init__(self, queue_size: int = PIPELINE_QUEUE_SIZE) -> None:
+        self._queue_size = queue_size
+        self._stages: List[Stage] = []
+        self._sink: Optional[Stage] = None
+
+    def queue(self) -> Queue:
+        return Queue(maxsize=self._queue_size)
+
+    def stage(
+        self,
+        name: str,
+        func: Callable[[Any], Any],
+        inbox: Queue,
+        outbox: Optional[Queue] = None,
+        producers: int = 1,
+    ) -> Stage:
+        stage = Stage(name=name, func=func, inbox=inbox, outbox=outbox, producers=producers)
+        self._stages.append(stage)
+        return stage
+
+    def sink(
+        self,
+        name: str,
+        func: Callable[[Any], Any],
+        inbox: Queue,
+        producers: int = 1,
+    ) -> Stage:
+        if self._sink is not None:
+            raise ValueError("Pipeline already has a sink")
+        self._sink = Stage(name=name, func=func, inbox=inbox, producers=producers)
+        return self._sink
+
+    def run(self, sources: List[Tuple[Queue, Iterable[Any]]]) -> Dict[str, StageStats]:
+        for stage in self._stages:
+            stage.start()
+
+        feeders = [
+            threading.Thread(target=self._feed, args=(queue, items), daemon=True)
+            for queue, items in sources
+        ]
+        for feeder in feeders:
+            feeder.start()
+        stages = list(self._stages)
+        if self._sink is not None:
+            # Drains its inbox until every producer stops, so upstream never blocks for good
+            self._sink.run()
+            stages.append(self._sink)
+        for feeder in feeders:
+            feeder.join()
+        for stage in self._stages:
+            stage.join()
+
+        for stage in stages:
+            if stage.error is not None:
+                raise stage.error
+        return {stage.name: stage.stats for stage in stages}
+
+    @staticmethod
+    def _feed(queue: Queue, items: Iterable[Any]) -> None:
+        try:
+            for item in items:
+                queue.put(item)
+        finally:
+            queue.put(STOP)
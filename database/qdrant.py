@@ -1,17 +1,54 @@
 from pathlib import Path
 import os
+import json
+import sys
+import time
+import shutil
+import heapq
 import numpy as np
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
-from typing import Union, List, Dict, Optional, Set
+from typing import Any, Callable, Union, List, Dict, Optional, Set, Tuple
 
 from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, VectorParams, PointStruct, PointIdsList, Record
+from qdrant_client.http.models import (
+    Distance,
+    Filter,
+    FilterSelector,
+    PayloadSchemaType,
+    Record,
+    ScoredPoint,
+    SearchRequest,
+    VectorParams,
+)
+from database.archive import export_archive, unpack_archive, install_state
+from database.columns import ColumnStore
+from database.filters import Conditions, build_filter, exclude_ids, restrict_ids
+from database.fusion import fuse_scores
+from database.minhash import MinHashIndex, group_pairs
+from database.querylog import QueryLogger
+from database.sharding import ShardMap
+from database.typeahead import PrefixIndex
+from database.snapshot import publish_snapshot
 from embedder.base import BaseVectorizer
 from preprocessor.json_preparator import BaseJsonPreparator
+from preprocessor.lemmatizer import Lemmatizer
 from preprocessor.query_preparator import QueryPreparator
 
-from utils import VectorInfoObject, InfoDocumentObject, SCROLL_LIMIT, SIMILARITY_THRESHOLD
+from utils import (
+    VectorBatch,
+    InfoDocumentObject,
+    SCROLL_LIMIT,
+    SIMILARITY_THRESHOLD,
+    UPLOAD_BATCH_SIZE,
+    VECTOR_DTYPE,
+    SNAPSHOT_KEEP,
+    ARCHIVE_CHUNK_SIZE,
+    DELETE_BATCH_SIZE,
+    SHINGLE_SIZE,
+    ANSWERS_CACHE_MAX_ITEMS,
+)
 
 
 class SingletonQdrant:
@@ -22,84 +59,190 @@ class SingletonQdrant:
 
 
 class QdrantDatabase:
-    def __init__(self, name: str, index: QdrantClient,  model: BaseVectorizer) -> None:
+    def __init__(
+        self,
+        name: str,
+        index: QdrantClient,
+        model: BaseVectorizer,
+        lemmatizer: Optional[Lemmatizer] = None,
+        shard_count: int = 1,
+        shard_strategy: str = "hash",
+    ) -> None:
         self._index = index
         self._name = name
         self._path = os.path.join(self._index._client.location, name)
         self._model = model
         
         self._embedding_size = self._model.embedding_size
-        self._query_preparator = QueryPreparator(model=self._model)
+        self._query_preparator = QueryPreparator(model=self._model, lemmatizer=lemmatizer)
         self._json_preparator: BaseJsonPreparator
+        self._minhash: Optional[MinHashIndex] = None
+        self._shards = ShardMap(shard_count=shard_count, strategy=shard_strategy)
+        self._shard_pool: Optional[ThreadPoolExecutor] = None
+        # Soft-deleted ids per collection, hidden from reads until compact()
+        self._tombstones: Dict[str, Set[int]] = {}
+        # Ids added or updated since the model was fitted, their current
+        # content never counted in document frequencies
+        self._unfitted: Dict[str, Set[int]] = {}
+        self._query_logger: Optional[QueryLogger] = None
     
+    @property
+    def _duplicates_collection(self) -> str:
+        return self._name
+
+    @property
+    def shard_count(self) -> int:
+        return self._shards.shard_count
     
-    def init_vectors(self, collection_name: str, vectors: List[VectorInfoObject]) -> None:
+    def init_vectors(self, collection_name: str, vectors: VectorBatch) -> None:
         self._create_collection(
             collection_name=collection_name,
             embedding_size=self._embedding_size,
         )
         self._add_vectors(collection_name=collection_name, items=vectors)
+        if collection_name == self._duplicates_collection and vectors.lemmas is not None:
+            self._build_minhash(ids=vectors.ids, lemmatized_documents=vectors.lemmas)
 
     def add_vectors(
         self,
         json_items: List[Dict],
         collection_name: Optional[str] = None,
-    ) -> None:
+    ) -> List[Set[int]]:
         if not collection_name:
             collection_name = self._name
 
         vectors = self._get_vector_objects(json_items=json_items)
         self._add_vectors(items=vectors, collection_name=collection_name)
+        self._mark_unfitted(collection_name, vectors.ids)
+        return self._index_duplicates(vectors=vectors, collection_name=collection_name)
 
     def update_vectors(
         self,
         json_items: List[Dict],
         collection_name: Optional[str] = None,
-    ) -> None:
+    ) -> List[Set[int]]:
         if not collection_name:
             collection_name = self._name
 
         vectors = self._get_vector_objects(json_items=json_items)
         self._update_vectors(vectors=vectors, collection_name=collection_name)
+        self._mark_unfitted(collection_name, vectors.ids)
+        return self._index_duplicates(vectors=vectors, collection_name=collection_name)
 
     def delete_vectors(
         self,
         ids: List[int],
         collection_name: Optional[str] = None,
+        soft: bool = False,
     ) -> None:
         if not collection_name:
             collection_name = self._name
             
         if isinstance(ids, int):
             ids = [ids]
-        
-        ids_to_delete = [
-            item.id for item in self.get_by_ids(ids, collection_name=collection_name)
-        ]
-            
-        self._index.delete(
-            collection_name=collection_name,
-            points_selector=PointIdsList(points=ids_to_delete),
-        )
+
+        if soft:
+            self._tombstones.setdefault(collection_name, set()).update(ids)
+            self._save_tombstones()
+        else:
+            self._delete_ids(ids=ids, collection_name=collection_name)
+
+    def delete_by_filter(
+        self,
+        query_filter: Union[Conditions, Filter],
+        collection_name: Optional[str] = None,
+        soft: bool = False,
+    ) -> List[int]:
+        if not collection_name:
+            collection_name = self._name
+
+        ids = self._filter_ids(query_filter=query_filter, collection_name=collection_name)
+        self.delete_vectors(ids=ids, collection_name=collection_name, soft=soft)
+        return ids
+
+    def compact(self, collection_name: Optional[str] = None) -> int:
+        """Removes soft-deleted points and takes them out of the model's
+        document frequencies. Returns the number of removed points."""
+        if not collection_name:
+            collection_name = self._name
+
+        ids = list(self._tombstones.get(collection_name, ()))
+        if not ids:
+            return 0
+        self._forget_documents(ids=ids, collection_names=[collection_name])
+        self._delete_ids(ids=ids, collection_name=collection_name)
+        self.save()
+        return len(ids)
+
+    def set_query_logger(self, logger: Optional[QueryLogger]) -> None:
+        # Opt-in capture of search traffic for server.replay, None turns it off
+        self._query_logger = logger
+
+    @property
+    def deleted_count(self) -> int:
+        return sum(len(ids) for ids in self._tombstones.values())
             
     def search(
         self,
         query: str,
         limit: int=5,
         collection_name: Optional[str] = None,
+        query_filter: Optional[Union[Conditions, Filter]] = None,
         ) -> str:
         if not collection_name:
             collection_name = self._name
+        started = time.perf_counter()
             
         query_vector = self._query_preparator.process(query)
-        search_result = self._index.search(
+        search_result = self._search_batch(
             collection_name=collection_name,
-            query_vector=query_vector,
-            limit=limit,
-            score_threshold=None,
-            with_vectors=False,
+            requests=self._search_requests(
+                [query_vector],
+                limit=limit,
+                with_payload=True,
+                query_filter=build_filter(query_filter),
+            ),
+        )[0]
+        self._log_queries(
+            operation="search",
+            queries=[query],
+            params={"limit": limit, "collection_name": collection_name, "query_filter": query_filter},
+            started=started,
+            results=[search_result],
         )
         return search_result
+
+    def search_many(
+        self,
+        queries: List[str],
+        limit: int = 5,
+        collection_name: Optional[str] = None,
+        query_filter: Optional[Union[Conditions, Filter]] = None,
+    ) -> List[List[ScoredPoint]]:
+        if not collection_name:
+            collection_name = self._name
+        if not queries:
+            return []
+        started = time.perf_counter()
+
+        query_vectors = self._query_preparator.process_batch(queries)
+        search_results = self._search_batch(
+            collection_name=collection_name,
+            requests=self._search_requests(
+                query_vectors,
+                limit=limit,
+                with_payload=True,
+                query_filter=build_filter(query_filter),
+            ),
+        )
+        self._log_queries(
+            operation="search",
+            queries=queries,
+            params={"limit": limit, "collection_name": collection_name, "query_filter": query_filter},
+            started=started,
+            results=search_results,
+        )
+        return search_results
     
     def search_similar(
         self,
@@ -107,19 +250,100 @@ class QdrantDatabase:
         limit: int=5,
         score_threshold: float = SIMILARITY_THRESHOLD,
         collection_name: Optional[str] = None,
+        query_filter: Optional[Union[Conditions, Filter]] = None,
         ) -> str:
         if not collection_name:
             collection_name = self._name
+        started = time.perf_counter()
+        params = {
+            "limit": limit,
+            "score_threshold": score_threshold,
+            "collection_name": collection_name,
+            "query_filter": query_filter,
+        }
+        query_filter = build_filter(query_filter)
             
-        query_vector = self._query_preparator.process(query)
-        search_result = self._index.search(
-            collection_name=collection_name,
-            query_vector=query_vector,
-            limit=limit,
-            score_threshold=score_threshold,
-            with_vectors=False,
+        if self._minhash is not None and collection_name == self._duplicates_collection:
+            search_result = self._search_minhash_candidates(
+                query=query,
+                limit=limit,
+                score_threshold=score_threshold,
+                collection_name=collection_name,
+                query_filter=query_filter,
+            )
+        else:
+            query_vector = self._query_preparator.process(query)
+            search_result = self._search_batch(
+                collection_name=collection_name,
+                requests=self._search_requests(
+                    [query_vector],
+                    limit=limit,
+                    with_payload=True,
+                    score_threshold=score_threshold,
+                    query_filter=query_filter,
+                ),
+            )[0]
+        self._log_queries(
+            operation="search_similar",
+            queries=[query],
+            params=params,
+            started=started,
+            results=[search_result],
         )
         return search_result
+
+    def search_similar_many(
+        self,
+        queries: List[str],
+        limit: int = 5,
+        score_threshold: float = SIMILARITY_THRESHOLD,
+        collection_name: Optional[str] = None,
+        query_filter: Optional[Union[Conditions, Filter]] = None,
+    ) -> List[List[ScoredPoint]]:
+        if not collection_name:
+            collection_name = self._name
+        if not queries:
+            return []
+        started = time.perf_counter()
+        params = {
+            "limit": limit,
+            "score_threshold": score_threshold,
+            "collection_name": collection_name,
+            "query_filter": query_filter,
+        }
+        query_filter = build_filter(query_filter)
+
+        if self._minhash is not None and collection_name == self._duplicates_collection:
+            search_results = [
+                self._search_minhash_candidates(
+                    query=query,
+                    limit=limit,
+                    score_threshold=score_threshold,
+                    collection_name=collection_name,
+                    query_filter=query_filter,
+                )
+                for query in queries
+            ]
+        else:
+            query_vectors = self._query_preparator.process_batch(queries)
+            search_results = self._search_batch(
+                collection_name=collection_name,
+                requests=self._search_requests(
+                    query_vectors,
+                    limit=limit,
+                    with_payload=True,
+                    score_threshold=score_threshold,
+                    query_filter=query_filter,
+                ),
+            )
+        self._log_queries(
+            operation="search_similar",
+            queries=queries,
+            params=params,
+            started=started,
+            results=search_results,
+        )
+        return search_results
     
     def update_index(
         self,
@@ -128,51 +352,68 @@ class QdrantDatabase:
         if not collection_name:
             collection_name = self._name
 
+        # The model is fitted anew, so soft-deleted points are just dropped
+        self._delete_ids(ids=list(self._tombstones.get(collection_name, ())), collection_name=collection_name)
         info_objects = self._collect_payloads(collection_name=collection_name)
         lemmatized_documents = self._lemmatize_documents(documents=info_objects)
         
         self._model.fit(corpus=lemmatized_documents)
-        self._create_collection(collection_name=collection_name, embedding_size=self._model.embedding_size)
-        
-        items_vectors: List[VectorInfoObject] = []
-        for item, lemma in zip(info_objects, lemmatized_documents):
-            vector = self._model.transform(lemma)
-            items_vectors.append(
-                VectorInfoObject(
-                    id=item.id,
-                    content=item.content,
-                    vector=vector,
-                )
-            )
+        self._embedding_size = self._model.embedding_size
+        self._unfitted.pop(collection_name, None)
+        self._create_collection(collection_name=collection_name, embedding_size=self._embedding_size)
         
+        items_vectors = self._vectorize(info_objects, lemmatized_documents)
         self._update_vectors(vectors=items_vectors, collection_name=collection_name)
+        if collection_name == self._duplicates_collection:
+            self._build_minhash(ids=items_vectors.ids, lemmatized_documents=lemmatized_documents)
         self.save()
 
     def find_duplicates(
         self,
         score_threshold: float = SIMILARITY_THRESHOLD,
         collection_name: Optional[str] = None,
+        query_filter: Optional[Union[Conditions, Filter]] = None,
     ):
         if not collection_name:
             collection_name = self._name
+        query_filter = build_filter(query_filter)
             
-        vectors = self._collect_vectors(collection_name=collection_name)
-        
+        if self._minhash is not None and collection_name == self._duplicates_collection:
+            # Only LSH candidate pairs are checked against stored vectors
+            pairs = self._verify_pairs(
+                pairs=self._minhash.candidate_pairs(),
+                score_threshold=score_threshold,
+                collection_name=collection_name,
+                query_filter=query_filter,
+            )
+            return group_pairs(pairs)
+
         duplicates_dict: Dict[int, Set] = defaultdict(set)
-        
-        for item in vectors:
-            search_result = self._index.search(
+
+        # Shard by shard: points of one shard are searched against all shards at once
+        for shard_name in self._shards.shard_names(collection_name):
+            vectors = self._collect_vectors(
+                collection_name=shard_name,
+                physical=True,
+                scroll_filter=self._visible_filter(collection_name, query_filter),
+            )
+            if not len(vectors):
+                continue
+            search_results = self._search_batch(
                 collection_name=collection_name,
-                query_vector=item.vector,
-                limit=5,
-                score_threshold=score_threshold,
-                with_vectors=False,
+                requests=self._search_requests(
+                    vectors.vectors,
+                    limit=5,
+                    with_payload=False,
+                    score_threshold=score_threshold,
+                    query_filter=query_filter,
+                ),
             )
-            if len(search_result) > 0:
+            for item_id, search_result in zip(vectors.ids, search_results):
                 for result in search_result:
-                    if item.id != result.id:
-                        duplicates_dict[item.id].add(result.id)
-                        duplicates_dict[item.id].add(item.id)
+                    if item_id != result.id:
+                        duplicates_dict[item_id].add(result.id)
+                        duplicates_dict[item_id].add(item_id)
         res = []
         for pairs in duplicates_dict.values():
             if pairs not in res:
@@ -187,18 +428,81 @@ class QdrantDatabase:
         if not collection_name:
             collection_name = self._name
         
-        return self._index.retrieve(collection_name=collection_name, ids=ids)
+        return self._retrieve(ids=ids, collection_name=collection_name)
 
     def save(self) -> None:
         self._model.save(self._path)
         self._json_preparator.save(self._path)
+        self._shards.save(self._path)
+        self._save_tombstones()
+        self._save_unfitted()
+        if self._minhash is not None:
+            self._minhash.save(self._path)
+            # Changes made after this save are journaled next to it
+            self._minhash.attach(self._path)
     
+    def publish_snapshot(self, keep: int = SNAPSHOT_KEEP) -> int:
+        # Immutable copy for read-only replicas (database.snapshot.SnapshotReplica)
+        return publish_snapshot(self, keep=keep)
+
+    def export_snapshot(self, archive_path: str) -> str:
+        return export_archive(self, archive_path)
+
     @classmethod
-    def load(cls, name: str, index: QdrantClient,  model: BaseVectorizer) -> None:
+    def import_snapshot(
+        cls,
+        archive_path: str,
+        index: QdrantClient,
+        model: BaseVectorizer,
+        lemmatizer: Optional[Lemmatizer] = None,
+    ) -> "QdrantDatabase":
+        """Restores a database written by export_snapshot under its original
+        name and collections, replacing existing ones."""
+        staging = os.path.join(index._client.location, f".import-{os.getpid()}")
+        if os.path.exists(staging):
+            shutil.rmtree(staging)
+        os.makedirs(staging)
+        try:
+            manifest = unpack_archive(archive_path, staging)
+            expected_kind = cls._snapshot_kind()
+            if manifest["kind"] != expected_kind:
+                raise ValueError(f"Archive holds a '{manifest['kind']}' database, expected '{expected_kind}'")
+            install_state(staging, os.path.join(index._client.location, manifest["name"]))
+            obj = cls._load_manifest(manifest, index=index, model=model, lemmatizer=lemmatizer)
+            if "shards" in manifest:
+                obj._shards = ShardMap(**manifest["shards"])
+            for collection_name in manifest["collections"].values():
+                obj._import_collection(staging, collection_name)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        obj.save()
+        return obj
+
+    @property
+    def memory_size(self) -> int:
+        return self._model.memory_size
+
+    def close(self) -> None:
+        # Stops shard reader threads, the pool is started again on the next read
+        if self._shard_pool is not None:
+            self._shard_pool.shutdown()
+            self._shard_pool = None
+
+    @classmethod
+    def load(
+        cls,
+        name: str,
+        index: QdrantClient,
+        model: BaseVectorizer,
+        lemmatizer: Optional[Lemmatizer] = None,
+    ) -> "QdrantDatabase":
         model.load(os.path.join(index._client.location, name))
         json_preparator = BaseJsonPreparator.load(os.path.join(index._client.location, name))
-        obj = cls(name=name, index=index, model=model)
+        obj = cls(name=name, index=index, model=model, lemmatizer=lemmatizer)
         obj._set_json_preparator(json_preparator)
+        obj._load_shards()
+        obj._load_tombstones()
+        obj._load_minhash()
         return obj
 
     def _create_collection(
@@ -206,78 +510,497 @@ class QdrantDatabase:
         collection_name: str,
         embedding_size: int,
     ) -> None:
-        
-        self._index.recreate_collection(
-            collection_name=collection_name,
-            vectors_config=VectorParams(size=embedding_size, distance=Distance.COSINE),
-            on_disk_payload=True
-        )
+        self._shards.reset(collection_name)
+        if self._tombstones.pop(collection_name, None):
+            self._save_tombstones()
+        for shard_name in self._shards.shard_names(collection_name):
+            self._index.recreate_collection(
+                collection_name=shard_name,
+                vectors_config=VectorParams(size=embedding_size, distance=Distance.DOT),
+                on_disk_payload=True
+            )
+            # Filtered searches use these instead of reading payloads from disk
+            for field_name, field_type in self._metadata_fields.items():
+                self._index.create_payload_index(
+                    collection_name=shard_name,
+                    field_name=field_name,
+                    field_schema=PayloadSchemaType(field_type),
+                )
+
+    @property
+    def _metadata_fields(self) -> Dict[str, str]:
+        json_preparator = getattr(self, "_json_preparator", None)
+        return json_preparator.metadata_fields if json_preparator is not None else {}
 
     def _add_vectors(
         self,
-        items: List[VectorInfoObject],
+        items: VectorBatch,
         collection_name: Optional[str] = None,
     ) -> None:
         if not collection_name:
             collection_name = self._name
 
-        for item in items:
-            self._index.upsert(
-                collection_name=collection_name,
-                wait=True,
-                points=[
-                    PointStruct(id=item.id, vector=item.vector, payload={"content": item.content}),
-                ]
-            )
+        self._upload_batch(batch=items, collection_name=collection_name)
 
     def _update_vectors(
         self,
-        vectors: List[VectorInfoObject],
+        vectors: VectorBatch,
         collection_name: Optional[str] = None,
     ) -> None:
         if not collection_name:
             collection_name = self._name
 
-        for item in vectors:
-            self._index.upsert(
-                    collection_name=collection_name,
-                    wait=True,
-                    points=[
-                        PointStruct(id=item.id, vector=item.vector, payload={"content": item.content}),
-                    ]
+        # Upsert replaces both vector and payload of existing points
+        self._upload_batch(batch=vectors, collection_name=collection_name)
+
+    def _upload_batch(self, batch: VectorBatch, collection_name: str) -> None:
+        self._upload_points(
+            collection_name=collection_name,
+            ids=batch.ids,
+            vectors=batch.vectors,
+            payloads=batch.payloads,
+        )
+
+    def _upload_points(
+        self,
+        collection_name: str,
+        ids: List[int],
+        vectors: np.ndarray,
+        payloads: List[Dict],
+    ) -> None:
+        if not len(ids):
+            return
+        # Upserting a soft-deleted id brings it back
+        self._discard_tombstones(collection_name, ids)
+        # The float32 matrix goes to the client as is, no PointStruct per item
+        positions: Dict[int, List[int]] = defaultdict(list)
+        for position, shard in enumerate(self._shards.assign(collection_name, ids)):
+            positions[shard].append(position)
+        shard_names = self._shards.shard_names(collection_name)
+
+        def upload(shard: int) -> None:
+            shard_positions = positions[shard]
+            self._index.upload_collection(
+                collection_name=shard_names[shard],
+                vectors=vectors[shard_positions] if len(positions) > 1 else vectors,
+                payload=[payloads[i] for i in shard_positions],
+                ids=[ids[i] for i in shard_positions],
+                batch_size=UPLOAD_BATCH_SIZE,
+            )
+
+        # Writes stay in the calling thread: the embedded client can't persist from others
+        for shard in positions:
+            upload(shard)
+
+    def _delete_points(self, ids: List[int], collection_name: str) -> None:
+        shard_names = self._shards.shard_names(collection_name)
+        located = self._shards.locate(collection_name, ids)
+        for shard, shard_ids in located.items():
+            # Selecting by a has_id filter skips ids the shard doesn't have,
+            # a plain id list fails on them in the embedded client
+            self._index.delete(
+                collection_name=shard_names[shard],
+                points_selector=FilterSelector(filter=restrict_ids(None, shard_ids)),
+            )
+        self._shards.remove(collection_name, ids)
+
+    def _retrieve(
+        self,
+        ids: List[int],
+        collection_name: str,
+        with_payload: bool = True,
+        with_vectors: bool = False,
+        include_deleted: bool = False,
+    ) -> List[Record]:
+        tombstones = self._tombstones.get(collection_name)
+        if tombstones and not include_deleted:
+            ids = [item_id for item_id in ids if item_id not in tombstones]
+        shard_names = self._shards.shard_names(collection_name)
+        located = self._shards.locate(collection_name, ids)
+        parts = self._map_shards(
+            lambda shard: self._index.retrieve(
+                collection_name=shard_names[shard],
+                ids=located[shard],
+                with_payload=with_payload,
+                with_vectors=with_vectors,
+            ),
+            list(located),
+        )
+        return [record for part in parts for record in part]
+
+    def _log_queries(
+        self,
+        operation: str,
+        queries: List[str],
+        params: Dict,
+        started: float,
+        results: List[List[ScoredPoint]],
+    ) -> None:
+        if self._query_logger is None:
+            return
+        self._query_logger.record(
+            database=self._name,
+            operation=operation,
+            queries=queries,
+            params=params,
+            elapsed=time.perf_counter() - started,
+            results=results,
+        )
+
+    def _delete_ids(self, ids: List[int], collection_name: str) -> None:
+        # Missing ids are skipped by the delete filter, so nothing is read beforehand
+        for start in range(0, len(ids), DELETE_BATCH_SIZE):
+            self._delete_points(ids=ids[start:start + DELETE_BATCH_SIZE], collection_name=collection_name)
+        if self._minhash is not None and collection_name == self._duplicates_collection:
+            for item_id in ids:
+                self._minhash.remove(item_id)
+        self._discard_tombstones(collection_name, ids)
+        unfitted = self._unfitted.get(collection_name)
+        if unfitted and not unfitted.isdisjoint(ids):
+            unfitted.difference_update(ids)
+            self._save_unfitted()
+
+    def _filter_ids(self, query_filter: Union[Conditions, Filter], collection_name: str) -> List[int]:
+        return [
+            item.id for item in self._scroll_storage(
+                with_payload=False,
+                with_vectors=False,
+                collection_name=collection_name,
+                scroll_filter=build_filter(query_filter),
+            )
+        ]
+
+    def _forget_documents(self, ids: List[int], collection_names: List[str]) -> None:
+        # Only points in the fitted corpus are subtracted, others were never counted
+        documents = [
+            InfoDocumentObject(id=item.id, content=(item.payload or {}).get("content", ""))
+            for collection_name in collection_names
+            for item in self._retrieve(
+                ids=[item_id for item_id in ids if item_id not in self._unfitted.get(collection_name, ())],
+                collection_name=collection_name,
+                include_deleted=True,
+            )
+        ]
+        self._model.remove_documents(self._lemmatize_documents(documents=documents))
+
+    def _visible_filter(self, collection_name: str, query_filter: Optional[Filter] = None) -> Optional[Filter]:
+        tombstones = self._tombstones.get(collection_name)
+        if not tombstones:
+            return query_filter
+        return exclude_ids(query_filter, list(tombstones))
+
+    def _discard_tombstones(self, collection_name: str, ids: List[int]) -> None:
+        tombstones = self._tombstones.get(collection_name)
+        if tombstones and not tombstones.isdisjoint(ids):
+            tombstones.difference_update(ids)
+            self._save_tombstones()
+
+    def _mark_unfitted(self, collection_name: str, ids: List[int]) -> None:
+        if ids:
+            self._unfitted.setdefault(collection_name, set()).update(ids)
+            self._save_unfitted()
+
+    def _save_tombstones(self) -> None:
+        # Written on every change: soft deletes must survive restarts and eviction
+        self._dump_ids("tombstones.json", self._tombstones)
+
+    def _save_unfitted(self) -> None:
+        self._dump_ids("unfitted.json", self._unfitted)
+
+    def _load_tombstones(self) -> None:
+        self._tombstones = self._read_ids("tombstones.json")
+        self._unfitted = self._read_ids("unfitted.json")
+
+    def _dump_ids(self, file_name: str, ids_sets: Dict[str, Set[int]]) -> None:
+        os.makedirs(self._path, exist_ok=True)
+        path = os.path.join(self._path, file_name)
+        with open(path + ".tmp", "w", encoding="utf-8") as file:
+            json.dump({name: list(ids) for name, ids in ids_sets.items() if ids}, file)
+        os.replace(path + ".tmp", path)
+
+    def _read_ids(self, file_name: str) -> Dict[str, Set[int]]:
+        path = os.path.join(self._path, file_name)
+        if not os.path.exists(path):
+            return {}
+        with open(path, "r", encoding="utf-8") as file:
+            return {name: set(ids) for name, ids in json.load(file).items()}
+
+    def _search_batch(
+        self,
+        collection_name: str,
+        requests: List[SearchRequest],
+    ) -> List[List[ScoredPoint]]:
+        if self._tombstones.get(collection_name):
+            requests = [
+                request.copy(update={"filter": self._visible_filter(collection_name, request.filter)})
+                for request in requests
+            ]
+        shard_names = self._shards.shard_names(collection_name)
+        if len(shard_names) == 1:
+            return self._index.search_batch(collection_name=collection_name, requests=requests)
+        if not requests:
+            return []
+
+        # Scatter the whole batch to every shard, gather top-k of each query with a heap
+        shard_results = self._map_shards(
+            lambda shard_name: self._index.search_batch(collection_name=shard_name, requests=requests),
+            shard_names,
+        )
+        return [
+            heapq.nlargest(request.limit, (hit for hits in per_shard for hit in hits), key=lambda hit: hit.score)
+            for request, per_shard in zip(requests, zip(*shard_results))
+        ]
+
+    def _map_shards(self, func: Callable[[Any], Any], items: List[Any]) -> List[Any]:
+        # Only for reads, which the embedded client serves from memory in any thread
+        if len(items) <= 1:
+            return [func(item) for item in items]
+        if self._shard_pool is None:
+            self._shard_pool = ThreadPoolExecutor(self._shards.shard_count, thread_name_prefix=f"{self._name}-shard")
+        return list(self._shard_pool.map(func, items))
+
+    def _load_shards(self) -> None:
+        if ShardMap.exists(self._path):
+            self._shards = ShardMap.load(self._path)
+        if self._shards.strategy == "size":
+            # Writes since the last save() are only in the shards themselves
+            for collection_name in self._snapshot_manifest()["collections"].values():
+                self._shards.rebuild(
+                    collection_name,
+                    [
+                        [item.id for item in self._scroll_storage(collection_name=shard_name, physical=True)]
+                        for shard_name in self._shards.shard_names(collection_name)
+                    ],
                 )
-            self._index.update_vectors(
+
+    def _search_requests(
+        self,
+        query_vectors: List[np.ndarray],
+        limit: int,
+        with_payload: bool,
+        score_threshold: Optional[float] = None,
+        query_filter: Optional[Filter] = None,
+    ) -> List[SearchRequest]:
+        return [
+            SearchRequest(
+                vector=query_vector.tolist(),
+                filter=query_filter,
+                limit=limit,
+                with_payload=with_payload,
+                with_vector=False,
+                score_threshold=score_threshold,
+            )
+            for query_vector in query_vectors
+        ]
+
+    def _import_collection(self, path: str, collection_name: str) -> None:
+        store = ColumnStore(path, collection_name)
+        self._create_collection(collection_name=collection_name, embedding_size=self._embedding_size)
+        # Memory-mapped columns are read from disk chunk by chunk
+        for start in range(0, len(store), ARCHIVE_CHUNK_SIZE):
+            end = min(start + ARCHIVE_CHUNK_SIZE, len(store))
+            self._upload_points(
                 collection_name=collection_name,
-                points=[
-                    PointStruct(id=item.id, vector=item.vector)
-                ]
+                ids=[store.id_at(i) for i in range(start, end)],
+                vectors=np.ascontiguousarray(store.vectors[start:end]),
+                payloads=[store.payload(i) for i in range(start, end)],
             )
 
+    @staticmethod
+    def _snapshot_kind() -> str:
+        return "documents"
+
+    @classmethod
+    def _load_manifest(
+        cls,
+        manifest: Dict,
+        index: QdrantClient,
+        model: BaseVectorizer,
+        lemmatizer: Optional[Lemmatizer] = None,
+    ) -> "QdrantDatabase":
+        return cls.load(name=manifest["name"], index=index, model=model, lemmatizer=lemmatizer)
+
+    def _snapshot_manifest(self) -> Dict:
+        return {
+            "kind": self._snapshot_kind(),
+            "name": self._name,
+            "embedding_size": self._embedding_size,
+            "collections": {"documents": self._name},
+            "shards": {"shard_count": self._shards.shard_count, "strategy": self._shards.strategy},
+        }
+
     def _set_json_preparator(self, preparator: BaseJsonPreparator) -> None:
         self._json_preparator = preparator
         
-    def _get_vector_objects(self, json_items: List[Dict]) -> List[VectorInfoObject]:
+    def _get_vector_objects(self, json_items: List[Dict]) -> VectorBatch:
         info_objects = self._json_preparator.convert_json(json_items)
-        vectors: List[VectorInfoObject] = []
-        for item in info_objects:
-            document_vector = self._query_preparator.process(item.content)
-            vectors.append(
-                VectorInfoObject(
-                    id=item.id,
-                    content=item.content,
-                    vector=document_vector,
-                )
+        lemmatized_documents = self._lemmatize_documents(documents=info_objects)
+        return self._vectorize(info_objects, lemmatized_documents)
+
+    def _vectorize(
+        self,
+        info_objects: List[InfoDocumentObject],
+        lemmatized_documents: List[List[str]],
+    ) -> VectorBatch:
+        if not info_objects:
+            return VectorBatch.empty(self._embedding_size)
+        return VectorBatch(
+            ids=[item.id for item in info_objects],
+            contents=[item.content for item in info_objects],
+            vectors=self._model.transform_batch(lemmatized_documents),
+            lemmas=lemmatized_documents,
+            metadata=[item.metadata for item in info_objects],
+        )
+
+    def _retrieve_vectors(
+        self,
+        ids: List[int],
+        collection_name: str,
+        with_payload: bool = False,
+        query_filter: Optional[Filter] = None,
+    ) -> VectorBatch:
+        if query_filter is None:
+            records = self._retrieve(
+                ids=ids,
+                collection_name=collection_name,
+                with_payload=with_payload,
+                with_vectors=True,
+            )
+        else:
+            # Points failing the filter are dropped by the index itself
+            records = self._scroll_storage(
+                with_payload=with_payload,
+                with_vectors=True,
+                collection_name=collection_name,
+                scroll_filter=restrict_ids(query_filter, ids),
+            )
+        if not records:
+            return VectorBatch.empty(self._embedding_size)
+        return VectorBatch(
+            ids=[item.id for item in records],
+            contents=[(item.payload or {}).get("content", '') for item in records],
+            vectors=np.array([item.vector for item in records], dtype=VECTOR_DTYPE),
+        )
+
+    def _build_minhash(self, ids: List[int], lemmatized_documents: List[List[str]]) -> None:
+        self._minhash = MinHashIndex()
+        for item_id, lemmas in zip(ids, lemmatized_documents):
+            self._minhash.add(item_id, lemmas)
+
+    def _load_minhash(self) -> None:
+        if not MinHashIndex.exists(self._path):
+            return
+        self._minhash = MinHashIndex.load(self._path)
+        if self._minhash.shingle_size != SHINGLE_SIZE:
+            # Indexes of an older shingle size can't be queried with the current one
+            documents = self._collect_payloads(collection_name=self._duplicates_collection)
+            self._build_minhash(
+                ids=[item.id for item in documents],
+                lemmatized_documents=self._lemmatize_documents(documents=documents),
+            )
+            self._minhash.save(self._path)
+            self._minhash.attach(self._path)
+
+    def _index_duplicates(
+        self,
+        vectors: VectorBatch,
+        collection_name: str,
+        score_threshold: float = SIMILARITY_THRESHOLD,
+    ) -> List[Set[int]]:
+        if self._minhash is None or vectors.lemmas is None or collection_name != self._duplicates_collection:
+            return []
+
+        for item_id, lemmas in zip(vectors.ids, vectors.lemmas):
+            self._minhash.add(item_id, lemmas)
+
+        pairs: Set[Tuple[int, int]] = set()
+        for item_id in vectors.ids:
+            for other_id in self._minhash.candidates(item_id):
+                pairs.add((item_id, other_id) if item_id < other_id else (other_id, item_id))
+        return group_pairs(
+            self._verify_pairs(pairs=pairs, score_threshold=score_threshold, collection_name=collection_name)
+        )
+
+    def _verify_pairs(
+        self,
+        pairs: Set[Tuple[int, int]],
+        score_threshold: float,
+        collection_name: str,
+        query_filter: Optional[Filter] = None,
+    ) -> List[Tuple[int, int]]:
+        if not pairs:
+            return []
+
+        ids = list({item_id for pair in pairs for item_id in pair})
+        stored = self._retrieve_vectors(ids=ids, collection_name=collection_name, query_filter=query_filter)
+        positions = {item_id: i for i, item_id in enumerate(stored.ids)}
+        pairs = [pair for pair in pairs if pair[0] in positions and pair[1] in positions]
+        if not pairs:
+            return []
+
+        left = stored.vectors[[positions[pair[0]] for pair in pairs]]
+        right = stored.vectors[[positions[pair[1]] for pair in pairs]]
+        scores = np.einsum("ij,ij->i", left, right)
+        return [pair for pair, score in zip(pairs, scores) if score >= score_threshold]
+
+    def _search_minhash_candidates(
+        self,
+        query: str,
+        limit: int,
+        score_threshold: float,
+        collection_name: str,
+        query_filter: Optional[Filter] = None,
+    ) -> List[ScoredPoint]:
+        lemmas = self._query_preparator.lemmatize(query)
+        tombstones = self._tombstones.get(collection_name, ())
+        candidates = [item_id for item_id in self._minhash.query(lemmas) if item_id not in tombstones]
+        if not candidates:
+            return []
+
+        stored = self._retrieve_vectors(
+            ids=candidates,
+            collection_name=collection_name,
+            with_payload=True,
+            query_filter=query_filter,
+        )
+        if not len(stored):
+            return []
+        scores = stored.vectors @ self._model.transform(lemmas)
+        return [
+            ScoredPoint(
+                id=stored.ids[i],
+                version=0,
+                score=float(scores[i]),
+                payload={"content": stored.contents[i]},
             )
-        return vectors
+            for i in np.argsort(-scores)[:limit]
+            if scores[i] >= score_threshold
+        ]
     
     def _scroll_storage(
         self,
         with_payload: bool = False,
         with_vectors: bool = False,
         collection_name: Optional[str] = None,
+        physical: bool = False,
+        scroll_filter: Optional[Filter] = None,
     ) -> List[Record]:
         if not collection_name:
             collection_name = self._name
+        if not physical:
+            scroll_filter = self._visible_filter(collection_name, scroll_filter)
+            # Shards of a logical collection are scrolled concurrently
+            parts = self._map_shards(
+                lambda shard_name: self._scroll_storage(
+                    with_payload=with_payload,
+                    with_vectors=with_vectors,
+                    collection_name=shard_name,
+                    physical=True,
+                    scroll_filter=scroll_filter,
+                ),
+                self._shards.shard_names(collection_name),
+            )
+            return [record for part in parts for record in part]
 
         limit = SCROLL_LIMIT
         info_objects: List[Record] = []
@@ -287,6 +1010,7 @@ class QdrantDatabase:
         while next_id is not None:
             batch, next_id = self._index.scroll(
                 collection_name=collection_name,
+                scroll_filter=scroll_filter,
                 limit=limit,
                 offset=offset,
                 with_payload=with_payload,
@@ -309,14 +1033,20 @@ class QdrantDatabase:
             collection_name=collection_name,
         )
         return [
-            InfoDocumentObject(id=item.id, content=item.payload.get("content"))
+            InfoDocumentObject(
+                id=item.id,
+                content=item.payload.get("content"),
+                metadata={key: value for key, value in item.payload.items() if key != "content"} or None,
+            )
             for item in payloads
         ]
 
     def _collect_vectors(
         self,
         collection_name: Optional[str] = None,
-    ) -> List[VectorInfoObject]:
+        physical: bool = False,
+        scroll_filter: Optional[Filter] = None,
+    ) -> VectorBatch:
         if not collection_name:
             collection_name = self._name
         
@@ -324,11 +1054,16 @@ class QdrantDatabase:
             with_payload=False,
             with_vectors=True,
             collection_name=collection_name,
+            physical=physical,
+            scroll_filter=scroll_filter,
+        )
+        if not vectors:
+            return VectorBatch.empty(self._embedding_size)
+        return VectorBatch(
+            ids=[item.id for item in vectors],
+            contents=[''] * len(vectors),
+            vectors=np.array([item.vector for item in vectors], dtype=VECTOR_DTYPE),
         )
-        return [
-            VectorInfoObject(id=item.id, vector=item.vector, content='')
-            for item in vectors
-        ]
 
     def _lemmatize_documents(self, documents: List[InfoDocumentObject]) -> List[List[str]]:
         lemmatized_documents: List[List[str]] = []
@@ -347,159 +1082,291 @@ class FAQQdrantDatabase(QdrantDatabase):
         model: BaseVectorizer,
         questions_collection_name: str,
         answers_collection_name: str,
+        lemmatizer: Optional[Lemmatizer] = None,
+        fusion: str = "max",
+        question_weight: float = 0.5,
+        cache_answers: bool = True,
+        shard_count: int = 1,
+        shard_strategy: str = "hash",
     ) -> None:
-        super().__init__(name, index, model)
+        super().__init__(name, index, model, lemmatizer, shard_count=shard_count, shard_strategy=shard_strategy)
         self._questions_collection_name = questions_collection_name
         self._answers_collection_name = answers_collection_name
+        self._fusion = fusion
+        self._question_weight = question_weight
+        self._cache_answers = cache_answers
+        self._answers_cache: Optional[Dict[int, str]] = None
+        self._typeahead: Optional[PrefixIndex] = None
+        # Answers served without an extra retrieve against those that needed one
+        self._answer_lookups = {"hits": 0, "misses": 0}
         
+    @property
+    def _duplicates_collection(self) -> str:
+        return self._answers_collection_name
+
     def add_vectors(
         self,
         json_faq: List[Dict],
-    ) -> None:
+    ) -> List[Set[int]]:
         question_vectors, answer_vectors = self._get_vector_objects(json_faq=json_faq)
         self._add_vectors(items=question_vectors, collection_name=self._questions_collection_name)
         self._add_vectors(items=answer_vectors, collection_name=self._answers_collection_name)
+        self._mark_unfitted(self._questions_collection_name, question_vectors.ids)
+        self._mark_unfitted(self._answers_collection_name, answer_vectors.ids)
+        self._cache_batch(answer_vectors)
+        self._index_typeahead(question_vectors)
+        return self._index_duplicates(vectors=answer_vectors, collection_name=self._answers_collection_name)
 
     def update_vectors(
         self,
         json_faq: List[Dict],
         collection_name: Optional[str] = None,
-    ) -> None:
+    ) -> List[Set[int]]:
         if not collection_name:
             collection_name = self._name
 
         question_vectors, answer_vectors = self._get_vector_objects(json_faq=json_faq)
         self._update_vectors(vectors=question_vectors, collection_name=self._questions_collection_name)
         self._update_vectors(vectors=answer_vectors, collection_name=self._answers_collection_name)
+        self._mark_unfitted(self._questions_collection_name, question_vectors.ids)
+        self._mark_unfitted(self._answers_collection_name, answer_vectors.ids)
+        self._cache_batch(answer_vectors)
+        self._index_typeahead(question_vectors)
+        return self._index_duplicates(vectors=answer_vectors, collection_name=self._answers_collection_name)
 
     def delete_vectors(
         self,
         ids: List[int],
         collection_name: Optional[str] = None,
+        soft: bool = False,
     ) -> None:
-        if not collection_name:
-            collection_name = self._name
-            
         if isinstance(ids, int):
             ids = [ids]
-            
-        ids_to_delete = [
-            item.id for item in self.get_by_ids(ids, collection_name=self._questions_collection_name)
-        ]
-            
-        self._index.delete(
-            collection_name=self._questions_collection_name,
-            points_selector=PointIdsList(points=ids_to_delete),
+
+        for collection_name in (self._questions_collection_name, self._answers_collection_name):
+            super().delete_vectors(ids=ids, collection_name=collection_name, soft=soft)
+        if not soft and self._answers_cache is not None:
+            for item_id in ids:
+                self._answers_cache.pop(item_id, None)
+
+    def delete_by_filter(
+        self,
+        query_filter: Union[Conditions, Filter],
+        collection_name: Optional[str] = None,
+        soft: bool = False,
+    ) -> List[int]:
+        # Metadata is the same in both collections, answers decide
+        ids = self._filter_ids(query_filter=query_filter, collection_name=self._answers_collection_name)
+        self.delete_vectors(ids=ids, soft=soft)
+        return ids
+
+    def compact(self, collection_name: Optional[str] = None) -> int:
+        ids = list(
+            self._tombstones.get(self._questions_collection_name, set())
+            | self._tombstones.get(self._answers_collection_name, set())
         )
-        self._index.delete(
-            collection_name=self._answers_collection_name,
-            points_selector=PointIdsList(points=ids_to_delete),
+        if not ids:
+            return 0
+        # Questions and answers were both in the corpus the model was fitted on
+        self._forget_documents(
+            ids=ids,
+            collection_names=[self._questions_collection_name, self._answers_collection_name],
         )
+        for collection_name in (self._questions_collection_name, self._answers_collection_name):
+            self._delete_ids(ids=ids, collection_name=collection_name)
+        if self._answers_cache is not None:
+            for item_id in ids:
+                self._answers_cache.pop(item_id, None)
+        self.save()
+        return len(ids)
             
     def search(
         self,
         query: str,
         limit: int=5,
-        ) -> str:
-        query_vector = self._query_preparator.process(query)
-        search_questions = self._index.search(
+        query_filter: Optional[Union[Conditions, Filter]] = None,
+        ) -> List[ScoredPoint]:
+        return self.search_many(queries=[query], limit=limit, query_filter=query_filter)[0]
+
+    def suggest(self, prefix: str, limit: int = 5) -> List[ScoredPoint]:
+        # Typeahead over questions: no lemmatization and no index calls per keystroke
+        if self._typeahead is None:
+            self._rebuild_typeahead()
+        tombstones = self._tombstones.get(self._questions_collection_name, ())
+        completions = self._typeahead.complete(prefix, limit=limit + len(tombstones) if tombstones else limit)
+        return [
+            ScoredPoint(id=item_id, version=0, score=weight, payload={"content": question})
+            for item_id, question, weight in completions
+            if item_id not in tombstones
+        ][:limit]
+
+    def record_selection(self, item_id: int, weight: float = 1.) -> None:
+        # Questions users pick are suggested earlier
+        if self._typeahead is None:
+            self._rebuild_typeahead()
+        self._typeahead.add_weight(item_id, weight)
+
+    def search_many(
+        self,
+        queries: List[str],
+        limit: int = 5,
+        query_filter: Optional[Union[Conditions, Filter]] = None,
+    ) -> List[List[ScoredPoint]]:
+        if not queries:
+            return []
+        started = time.perf_counter()
+        params = {"limit": limit, "query_filter": query_filter}
+        query_filter = build_filter(query_filter)
+
+        # One batched request per collection for all queries, answers are taken
+        # from the in-memory cache or from payloads of answer hits
+        query_vectors = self._query_preparator.process_batch(queries)
+        search_questions = self._search_batch(
             collection_name=self._questions_collection_name,
-            query_vector=query_vector,
-            limit=limit,
-            with_vectors=False,
+            requests=self._search_requests(
+                query_vectors,
+                limit=limit,
+                with_payload=False,
+                query_filter=query_filter,
+            ),
         )
-        search_answers = self._index.search(
+        search_answers = self._search_batch(
             collection_name=self._answers_collection_name,
-            query_vector=query_vector,
-            limit=limit,
-            with_vectors=False,
+            requests=self._search_requests(
+                query_vectors,
+                limit=limit,
+                with_payload=self._answers_cache is None,
+                query_filter=query_filter,
+            ),
         )
-        result = sorted(list(search_questions+search_answers), key=lambda x: -x.score)
 
-        result_ids: list[int] = []
-        for item in result:
-            if item.id not in result_ids:
-                result_ids.append(item.id)
+        fused = [
+            fuse_scores(
+                results=(questions, answers),
+                weights=(self._question_weight, 1 - self._question_weight),
+                method=self._fusion,
+            )[:limit]
+            for questions, answers in zip(search_questions, search_answers)
+        ]
+        answers_content = self._get_answers(
+            ids={item_id for hits in fused for item_id, _ in hits},
+            search_answers=search_answers,
+        )
+        search_results = [
+            [
+                ScoredPoint(id=item_id, version=0, score=score, payload={"content": answers_content.get(item_id)})
+                for item_id, score in hits
+            ]
+            for hits in fused
+        ]
+        self._log_queries(
+            operation="search",
+            queries=queries,
+            params=params,
+            started=started,
+            results=search_results,
+        )
+        return search_results
 
-        return self.get_by_ids(ids=result_ids[:limit], collection_name=self._answers_collection_name)
+    @property
+    def cache_stats(self) -> Dict[str, int]:
+        return dict(self._answer_lookups)
 
     def search_similar(
         self,
         query: str,
         limit: int=5,
         score_threshold: float = SIMILARITY_THRESHOLD,
+        query_filter: Optional[Union[Conditions, Filter]] = None,
         ) -> str:  
-        query_vector = self._query_preparator.process(query)
-        search_result = self._index.search(
+        return super().search_similar(
+            query=query,
+            limit=limit,
+            score_threshold=score_threshold,
             collection_name=self._answers_collection_name,
-            query_vector=query_vector,
+            query_filter=query_filter,
+        )
+
+    def search_similar_many(
+        self,
+        queries: List[str],
+        limit: int = 5,
+        score_threshold: float = SIMILARITY_THRESHOLD,
+        query_filter: Optional[Union[Conditions, Filter]] = None,
+    ) -> List[List[ScoredPoint]]:
+        return super().search_similar_many(
+            queries=queries,
             limit=limit,
             score_threshold=score_threshold,
-            with_vectors=False,
+            collection_name=self._answers_collection_name,
+            query_filter=query_filter,
         )
-        return search_result
     
     def update_index(self):
+        for collection_name in (self._questions_collection_name, self._answers_collection_name):
+            self._delete_ids(ids=list(self._tombstones.get(collection_name, ())), collection_name=collection_name)
         questions_objects = self._collect_payloads(collection_name=self._questions_collection_name)
         answers_objects = self._collect_payloads(collection_name=self._answers_collection_name)
         lemmatized_questions = self._lemmatize_documents(documents=questions_objects)
         lemmatized_answers = self._lemmatize_documents(documents=answers_objects)
         
         self._model.fit(corpus=lemmatized_questions + lemmatized_answers)
-        self._create_collection(collection_name=self._questions_collection_name, embedding_size=self._model.embedding_size)
-        self._create_collection(collection_name=self._answers_collection_name, embedding_size=self._model.embedding_size)
+        self._embedding_size = self._model.embedding_size
+        self._unfitted.pop(self._questions_collection_name, None)
+        self._unfitted.pop(self._answers_collection_name, None)
+        self._create_collection(collection_name=self._questions_collection_name, embedding_size=self._embedding_size)
+        self._create_collection(collection_name=self._answers_collection_name, embedding_size=self._embedding_size)
         
-        questions_vectors: List[VectorInfoObject] = []
-        answers_vectors: List[VectorInfoObject] = []
-        for item, lemma in zip(questions_objects, lemmatized_questions):
-            vector = self._model.transform(lemma)
-            questions_vectors.append(
-                VectorInfoObject(
-                    id=item.id,
-                    content=item.content,
-                    vector=vector,
-                )
-            )
-        for item, lemma in zip(answers_objects, lemmatized_answers):
-            vector = self._model.transform(lemma)
-            answers_vectors.append(
-                VectorInfoObject(
-                    id=item.id,
-                    content=item.content,
-                    vector=vector,
-                )
-            )
+        questions_vectors = self._vectorize(questions_objects, lemmatized_questions)
+        answers_vectors = self._vectorize(answers_objects, lemmatized_answers)
         
         self._update_vectors(vectors=questions_vectors, collection_name=self._questions_collection_name)
         self._update_vectors(vectors=answers_vectors, collection_name=self._answers_collection_name)
+        self._build_minhash(ids=answers_vectors.ids, lemmatized_documents=lemmatized_answers)
+        self._answers_cache = None
+        if self._cache_answers and len(answers_vectors) <= ANSWERS_CACHE_MAX_ITEMS:
+            self._answers_cache = dict(zip(answers_vectors.ids, answers_vectors.contents))
+        self._build_typeahead(
+            ids=questions_vectors.ids,
+            questions=questions_vectors.contents,
+            lemmatized_questions=lemmatized_questions,
+        )
         self.save()
 
     def find_duplicates(
         self,
         score_threshold: float = SIMILARITY_THRESHOLD,
+        query_filter: Optional[Union[Conditions, Filter]] = None,
     ):
-        vectors = self._collect_vectors(collection_name=self._answers_collection_name)
-        
-        duplicates_dict: Dict[int, Set] = defaultdict(set)
-        
-        for item in vectors:
-            search_result = self._index.search(
-                collection_name=self._answers_collection_name,
-                query_vector=item.vector,
-                limit=5,
-                score_threshold=score_threshold,
-                with_vectors=False,
+        return super().find_duplicates(
+            score_threshold=score_threshold,
+            collection_name=self._answers_collection_name,
+            query_filter=query_filter,
+        )
+
+    def save(self) -> None:
+        super().save()
+        if self._typeahead is not None:
+            self._typeahead.save(self._path)
+            self._typeahead.attach(self._path)
+        with open(os.path.join(self._path, "search_config.json"), "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "fusion": self._fusion,
+                    "question_weight": self._question_weight,
+                    "cache_answers": self._cache_answers,
+                },
+                file,
             )
-            if len(search_result) > 0:
-                for result in search_result:
-                    if item.id != result.id:
-                        duplicates_dict[item.id].add(result.id)
-                        duplicates_dict[item.id].add(item.id)
-        res = []
-        for pairs in duplicates_dict.values():
-            if pairs not in res:
-                res.append(pairs) 
-        return res
+
+    @property
+    def memory_size(self) -> int:
+        size = self._model.memory_size
+        if self._typeahead is not None:
+            size += self._typeahead.memory_size
+        if self._answers_cache is not None:
+            size += sum(sys.getsizeof(content) for content in self._answers_cache.values())
+        return size
 
     @classmethod
     def load(
@@ -509,38 +1376,198 @@ class FAQQdrantDatabase(QdrantDatabase):
         model: BaseVectorizer,
         questions_collection_name: str,
         answers_collection_name: str,
-    ) -> None:
+        lemmatizer: Optional[Lemmatizer] = None,
+        fusion: Optional[str] = None,
+        question_weight: Optional[float] = None,
+        cache_answers: Optional[bool] = None,
+    ) -> "FAQQdrantDatabase":
         model.load(os.path.join(index._client.location, name))
         json_preparator = BaseJsonPreparator.load(os.path.join(index._client.location, name))
+
+        # Explicit arguments override search settings saved with the database
+        search_config = {}
+        config_path = os.path.join(index._client.location, name, "search_config.json")
+        if os.path.exists(config_path):
+            with open(config_path, "r", encoding="utf-8") as file:
+                search_config = json.load(file)
+        if fusion is not None:
+            search_config["fusion"] = fusion
+        if question_weight is not None:
+            search_config["question_weight"] = question_weight
+        if cache_answers is not None:
+            search_config["cache_answers"] = cache_answers
+
         obj = cls(
             name=name,
             index=index,
             model=model,
             questions_collection_name=questions_collection_name,
             answers_collection_name=answers_collection_name,
+            lemmatizer=lemmatizer,
+            **search_config,
         )
         obj._set_json_preparator(json_preparator)
+        obj._load_shards()
+        obj._load_tombstones()
+        obj._load_minhash()
+        if PrefixIndex.exists(obj._path):
+            obj._typeahead = PrefixIndex.load(obj._path)
+        obj._fill_answers_cache()
+        return obj
+
+    @classmethod
+    def import_snapshot(
+        cls,
+        archive_path: str,
+        index: QdrantClient,
+        model: BaseVectorizer,
+        lemmatizer: Optional[Lemmatizer] = None,
+    ) -> "FAQQdrantDatabase":
+        obj = super().import_snapshot(archive_path, index=index, model=model, lemmatizer=lemmatizer)
+        obj._fill_answers_cache()
+        return obj
+
+    def _get_answers(
+        self,
+        ids: Set[int],
+        search_answers: List[List[ScoredPoint]],
+    ) -> Dict[int, str]:
+        answers_cache = self._answers_cache
+        if answers_cache is not None:
+            missing = [item_id for item_id in ids if item_id not in answers_cache]
+            self._answer_lookups["hits"] += len(ids) - len(missing)
+            self._answer_lookups["misses"] += len(missing)
+            if missing:
+                for item in self.get_by_ids(ids=missing, collection_name=self._answers_collection_name):
+                    answers_cache[item.id] = item.payload.get("content")
+            return {item_id: answers_cache.get(item_id) for item_id in ids}
+
+        answers_content = {
+            hit.id: hit.payload.get("content")
+            for hits in search_answers for hit in hits
+            if hit.id in ids and hit.payload
+        }
+        # Only ids found by questions alone need an extra retrieve
+        missing = [item_id for item_id in ids if item_id not in answers_content]
+        self._answer_lookups["hits"] += len(ids) - len(missing)
+        self._answer_lookups["misses"] += len(missing)
+        if missing:
+            for item in self.get_by_ids(ids=missing, collection_name=self._answers_collection_name):
+                answers_content[item.id] = item.payload.get("content")
+        return answers_content
+
+    @staticmethod
+    def _snapshot_kind() -> str:
+        return "faq"
+
+    @classmethod
+    def _load_manifest(
+        cls,
+        manifest: Dict,
+        index: QdrantClient,
+        model: BaseVectorizer,
+        lemmatizer: Optional[Lemmatizer] = None,
+    ) -> "FAQQdrantDatabase":
+        # The collections are imported after this, the answers cache is filled then
+        search_config = dict(manifest["search"])
+        cache_answers = search_config.pop("cache_answers", True)
+        obj = cls.load(
+            name=manifest["name"],
+            index=index,
+            model=model,
+            questions_collection_name=manifest["collections"]["questions"],
+            answers_collection_name=manifest["collections"]["answers"],
+            lemmatizer=lemmatizer,
+            cache_answers=False,
+            **search_config,
+        )
+        obj._cache_answers = cache_answers
         return obj
 
-    def _get_vector_objects(self, json_faq: List[Dict]) -> List[VectorInfoObject]:
+    def _snapshot_manifest(self) -> Dict:
+        return {
+            "kind": self._snapshot_kind(),
+            "name": self._name,
+            "embedding_size": self._embedding_size,
+            "collections": {
+                "questions": self._questions_collection_name,
+                "answers": self._answers_collection_name,
+            },
+            "search": {
+                "fusion": self._fusion,
+                "question_weight": self._question_weight,
+                "cache_answers": self._cache_answers,
+            },
+            "shards": {"shard_count": self._shards.shard_count, "strategy": self._shards.strategy},
+        }
+
+    def _delete_ids(self, ids: List[int], collection_name: str) -> None:
+        super()._delete_ids(ids=ids, collection_name=collection_name)
+        if self._typeahead is not None and collection_name == self._questions_collection_name:
+            for item_id in ids:
+                self._typeahead.remove(item_id)
+
+    def _build_typeahead(
+        self,
+        ids: List[int],
+        questions: List[str],
+        lemmatized_questions: List[List[str]],
+    ) -> None:
+        self._typeahead = PrefixIndex()
+        self._typeahead.add_many(zip(ids, questions, lemmatized_questions))
+
+    def _index_typeahead(self, question_vectors: VectorBatch) -> None:
+        if self._typeahead is None:
+            return
+        lemmas = question_vectors.lemmas or [None] * len(question_vectors)
+        self._typeahead.add_many(zip(question_vectors.ids, question_vectors.contents, lemmas))
+
+    def _rebuild_typeahead(self) -> None:
+        # Databases saved before typeahead existed get the index on first use
+        questions = self._collect_payloads(collection_name=self._questions_collection_name)
+        self._build_typeahead(
+            ids=[item.id for item in questions],
+            questions=[item.content for item in questions],
+            lemmatized_questions=self._lemmatize_documents(documents=questions),
+        )
+        # Saved right away, so later changes can be journaled on top of it
+        os.makedirs(self._path, exist_ok=True)
+        self._typeahead.save(self._path)
+        self._typeahead.attach(self._path)
+
+    def _fill_answers_cache(self) -> None:
+        # Filled when the database is opened, so the registry accounts for it
+        # in memory_size, not on the first search
+        self._answers_cache = None
+        if not self._cache_answers:
+            return
+        count = sum(
+            self._index.count(collection_name=shard_name).count
+            for shard_name in self._shards.shard_names(self._answers_collection_name)
+        )
+        if count <= ANSWERS_CACHE_MAX_ITEMS:
+            self._answers_cache = {
+                item.id: item.content
+                for item in self._collect_payloads(collection_name=self._answers_collection_name)
+            }
+
+    def _cache_batch(self, answer_vectors: VectorBatch) -> None:
+        if self._answers_cache is not None:
+            self._answers_cache.update(zip(answer_vectors.ids, answer_vectors.contents))
+            if len(self._answers_cache) > ANSWERS_CACHE_MAX_ITEMS:
+                # Grown past the bound: answers are read from payloads again
+                self._answers_cache = None
+
+    def _get_vector_objects(self, json_faq: List[Dict]) -> Tuple[VectorBatch, VectorBatch]:
         info_objects = self._json_preparator.convert_json(json_faq)
-        question_vectors: List[VectorInfoObject] = []
-        answer_vectors: List[VectorInfoObject] = []
-        for item in info_objects:
-            question_vector = self._query_preparator.process(item.question)
-            answer_vector = self._query_preparator.process(item.answer)
-            question_vectors.append(
-                VectorInfoObject(
-                    id=item.id,
-                    content=item.question,
-                    vector=question_vector,
-                )
-            )
-            answer_vectors.append(
-                VectorInfoObject(
-                    id=item.id,
-                    content=item.answer,
-                    vector=answer_vector,
-                )
-            )
+        questions = [
+            InfoDocumentObject(id=item.id, content=item.question, metadata=item.metadata)
+            for item in info_objects
+        ]
+        answers = [
+            InfoDocumentObject(id=item.id, content=item.answer, metadata=item.metadata)
+            for item in info_objects
+        ]
+        question_vectors = self._vectorize(questions, self._lemmatize_documents(documents=questions))
+        answer_vectors = self._vectorize(answers, self._lemmatize_documents(documents=answers))
         return question_vectors, answer_vectors
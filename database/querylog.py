@@ -0,0 +1,104 @@
+import json
+import time
+import random
+import threading
+
+from typing import Any, Dict, Iterator, List, Optional
+
+from qdrant_client.http.models import Filter
+
+from utils import QUERY_LOG_SAMPLE_RATE, QUERY_LOG_FLUSH_EVERY
+
+
+class QueryLogger:
+    """Appends a sampled share of queries to a JSON-lines file, one compact
+    record per query: time, database, operation, text, parameters, latency
+    and result ids. Records are buffered and written flush_every at a time."""
+
+    def __init__(
+        self,
+        path: str,
+        sample_rate: float = QUERY_LOG_SAMPLE_RATE,
+        flush_every: int = QUERY_LOG_FLUSH_EVERY,
+        seed: Optional[int] = None,
+    ) -> None:
+        if not 0. <= sample_rate <= 1.:
+            raise ValueError("sample_rate must be within [0, 1]")
+        self._path = path
+        self._sample_rate = sample_rate
+        self._flush_every = flush_every
+        self._random = random.Random(seed)
+        self._buffer: List[str] = []
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def record(
+        self,
+        database: str,
+        operation: str,
+        queries: List[str],
+        params: Dict[str, Any],
+        elapsed: float,
+        results: List[List[Any]],
+    ) -> None:
+        # A batch shares one latency, every query of it is sampled on its own
+        params = {key: self._to_json(value) for key, value in params.items() if value is not None}
+        lines = []
+        with self._lock:
+            for query, hits in zip(queries, results):
+                if self._random.random() >= self._sample_rate:
+                    continue
+                lines.append(json.dumps(
+                    {
+                        "ts": round(time.time(), 3),
+                        "db": database,
+                        "op": operation,
+                        "q": query,
+                        "p": params,
+                        "ms": round(elapsed * 1000, 3),
+                        "n": len(queries),
+                        "ids": [hit.id for hit in hits],
+                    },
+                    ensure_ascii=False,
+                    separators=(",", ":"),
+                ))
+            self._buffer.extend(lines)
+            if len(self._buffer) >= self._flush_every:
+                self._flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush()
+            self._file.close()
+
+    @staticmethod
+    def read(path: str) -> Iterator[Dict]:
+        with open(path, "r", encoding="utf-8") as file:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+    def _flush(self) -> None:
+        if self._buffer:
+            self._file.write("\n".join(self._buffer) + "\n")
+            self._file.flush()
+            self._buffer = []
+
+    @staticmethod
+    def _to_json(value: Any) -> Any:
+        if isinstance(value, Filter):
+            return {"__filter__": json.loads(value.json(exclude_none=True))}
+        return value
+
+
+def restore_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    # Filter objects were logged as {"__filter__": ...}
+    restored = dict(params)
+    query_filter = restored.get("query_filter")
+    if isinstance(query_filter, dict) and "__filter__" in query_filter:
+        restored["query_filter"] = Filter.parse_obj(query_filter["__filter__"])
+    return restored
@@ -0,0 +1,173 @@
+import os
+import threading
+from collections import OrderedDict
+
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from qdrant_client import QdrantClient
+
+from embedder.base import BaseVectorizer
+from embedder.tfidf import TfIdf
+from preprocessor.lemmatizer import Lemmatizer
+from database.qdrant import QdrantDatabase, FAQQdrantDatabase
+from database.querylog import QueryLogger
+
+from utils import REGISTRY_MEMORY_BUDGET
+
+
+class DatabaseSpec(NamedTuple):
+    name: str
+    questions_collection_name: Optional[str] = None
+    answers_collection_name: Optional[str] = None
+
+    @property
+    def is_faq(self) -> bool:
+        return bool(self.questions_collection_name and self.answers_collection_name)
+
+
+class DatabaseRegistry:
+    """Opens databases of one index on first use and keeps the most recently
+    used of them in memory while their models fit into memory_budget bytes.
+    All databases share one lemmatizer and, if given, one query logger."""
+
+    def __init__(
+        self,
+        index: QdrantClient,
+        model_factory: Callable[[], BaseVectorizer] = TfIdf,
+        memory_budget: int = REGISTRY_MEMORY_BUDGET,
+        lemmatizer: Optional[Lemmatizer] = None,
+        query_logger: Optional[QueryLogger] = None,
+    ) -> None:
+        self._index = index
+        self._model_factory = model_factory
+        self._memory_budget = memory_budget
+        self._lemmatizer = lemmatizer if lemmatizer is not None else Lemmatizer()
+        self._query_logger = query_logger
+
+        self._specs: Dict[str, DatabaseSpec] = {}
+        self._loaded: "OrderedDict[str, QdrantDatabase]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._lock = threading.RLock()
+
+    def register(
+        self,
+        name: str,
+        questions_collection_name: Optional[str] = None,
+        answers_collection_name: Optional[str] = None,
+    ) -> None:
+        with self._lock:
+            self._specs[name] = DatabaseSpec(
+                name=name,
+                questions_collection_name=questions_collection_name,
+                answers_collection_name=answers_collection_name,
+            )
+
+    def add(self, database: QdrantDatabase) -> None:
+        # Take an already opened database (e.g. just built) under registry control
+        with self._lock:
+            if isinstance(database, FAQQdrantDatabase):
+                self.register(
+                    name=database._name,
+                    questions_collection_name=database._questions_collection_name,
+                    answers_collection_name=database._answers_collection_name,
+                )
+            else:
+                self.register(name=database._name)
+            self.evict(database._name)
+            self._put(database._name, database)
+
+    def get(self, name: str) -> QdrantDatabase:
+        with self._lock:
+            database = self._loaded.get(name)
+            if database is not None:
+                self._loaded.move_to_end(name)
+                return database
+
+            spec = self._specs.get(name)
+            if spec is None:
+                raise KeyError(f"Database '{name}' is not registered")
+            if not os.path.exists(os.path.join(self._index._client.location, name)):
+                raise FileNotFoundError(f"Database '{name}' is not built")
+
+            database = self._load(spec)
+            self._put(name, database)
+            return database
+
+    def __getitem__(self, name: str) -> QdrantDatabase:
+        return self.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._specs
+
+    def warm(self, names: Iterable[str]) -> None:
+        # Names are loaded in order, so put the hottest databases last
+        for name in names:
+            self.get(name)
+
+    def evict(self, name: str) -> bool:
+        with self._lock:
+            database = self._loaded.pop(name, None)
+            self._sizes.pop(name, None)
+            if database is not None:
+                database.close()
+            return database is not None
+
+    def clear(self) -> None:
+        with self._lock:
+            for database in self._loaded.values():
+                database.close()
+            self._loaded.clear()
+            self._sizes.clear()
+
+    @property
+    def loaded(self) -> List[str]:
+        with self._lock:
+            return list(self._loaded)
+
+    @property
+    def registered(self) -> List[str]:
+        return list(self._specs)
+
+    @property
+    def memory_usage(self) -> int:
+        return sum(self._sizes.values())
+
+    def refresh(self, name: str) -> None:
+        # Re-measure a database after its model was refitted (update_index)
+        with self._lock:
+            database = self._loaded.get(name)
+            if database is not None:
+                self._sizes[name] = database.memory_size
+                self._shrink(keep=name)
+
+    def _load(self, spec: DatabaseSpec) -> QdrantDatabase:
+        if spec.is_faq:
+            return FAQQdrantDatabase.load(
+                name=spec.name,
+                index=self._index,
+                model=self._model_factory(),
+                questions_collection_name=spec.questions_collection_name,
+                answers_collection_name=spec.answers_collection_name,
+                lemmatizer=self._lemmatizer,
+            )
+        return QdrantDatabase.load(
+            name=spec.name,
+            index=self._index,
+            model=self._model_factory(),
+            lemmatizer=self._lemmatizer,
+        )
+
+    def _put(self, name: str, database: QdrantDatabase) -> None:
+        if self._query_logger is not None:
+            database.set_query_logger(self._query_logger)
+        self._loaded[name] = database
+        self._sizes[name] = database.memory_size
+        self._shrink(keep=name)
+
+    def _shrink(self, keep: str) -> None:
+        # Drop least recently used databases, the one just requested always stays
+        while self.memory_usage > self._memory_budget and len(self._loaded) > 1:
+            oldest = next(iter(self._loaded))
+            if oldest == keep:
+                break
+            self.evict(oldest)
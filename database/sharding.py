@@ -0,0 +1,110 @@
+import os
+import pickle
+import zlib
+from collections import defaultdict
+
+from typing import Dict, List, Union
+
+from utils import SHARD_SUFFIX
+
+PointId = Union[int, str]
+
+SHARD_STRATEGIES = ("hash", "size")
+
+
+class ShardMap:
+    """Placement of points of every logical collection in shard_count
+    physical collections.
+
+    "hash" owns a point by crc32 of its id, "size" sends every new point to
+    the least filled shard and remembers owners. Owners are not saved, the
+    database rebuilds them from the shards on load. With one shard the physical
+    collection keeps the logical name, so unsharded databases stay as they were.
+    """
+
+    def __init__(self, shard_count: int = 1, strategy: str = "hash") -> None:
+        if shard_count < 1:
+            raise ValueError("shard_count must be positive")
+        if strategy not in SHARD_STRATEGIES:
+            raise ValueError(f"Unknown shard strategy '{strategy}', expected one of {SHARD_STRATEGIES}")
+        self.shard_count = shard_count
+        self.strategy = strategy
+        self._owners: Dict[str, Dict[PointId, int]] = defaultdict(dict)
+        self._sizes: Dict[str, List[int]] = defaultdict(lambda: [0] * self.shard_count)
+
+    def shard_names(self, collection_name: str) -> List[str]:
+        if self.shard_count == 1:
+            return [collection_name]
+        return [f"{collection_name}{SHARD_SUFFIX}{shard}" for shard in range(self.shard_count)]
+
+    def assign(self, collection_name: str, ids: List[PointId]) -> List[int]:
+        # Shard of every upserted id, new ids are placed as a side effect
+        if self.strategy == "hash":
+            return [self._hash(item_id) for item_id in ids]
+
+        owners = self._owners[collection_name]
+        sizes = self._sizes[collection_name]
+        shards = []
+        for item_id in ids:
+            shard = owners.get(item_id)
+            if shard is None:
+                shard = min(range(self.shard_count), key=sizes.__getitem__)
+                owners[item_id] = shard
+                sizes[shard] += 1
+            shards.append(shard)
+        return shards
+
+    def locate(self, collection_name: str, ids: List[PointId]) -> Dict[int, List[PointId]]:
+        # Ids of existing points grouped by shard, unknown ids are skipped
+        located: Dict[int, List[PointId]] = defaultdict(list)
+        if self.strategy == "hash":
+            for item_id in ids:
+                located[self._hash(item_id)].append(item_id)
+            return located
+
+        owners = self._owners[collection_name]
+        for item_id in ids:
+            if item_id in owners:
+                located[owners[item_id]].append(item_id)
+        return located
+
+    def remove(self, collection_name: str, ids: List[PointId]) -> None:
+        if self.strategy == "hash":
+            return
+        owners = self._owners[collection_name]
+        sizes = self._sizes[collection_name]
+        for item_id in ids:
+            shard = owners.pop(item_id, None)
+            if shard is not None:
+                sizes[shard] -= 1
+
+    def reset(self, collection_name: str) -> None:
+        self._owners.pop(collection_name, None)
+        self._sizes.pop(collection_name, None)
+
+    def rebuild(self, collection_name: str, shard_ids: List[List[PointId]]) -> None:
+        # Owners from the ids every shard holds, as written by upserts since any save
+        self.reset(collection_name)
+        if self.strategy == "hash":
+            return
+        owners = self._owners[collection_name]
+        for shard, ids in enumerate(shard_ids):
+            owners.update(dict.fromkeys(ids, shard))
+        self._sizes[collection_name] = [len(ids) for ids in shard_ids]
+
+    def save(self, path: str) -> None:
+        with open(os.path.join(path, "shards.bin"), "wb") as file:
+            pickle.dump({"shard_count": self.shard_count, "strategy": self.strategy}, file)
+
+    @classmethod
+    def load(cls, path: str) -> "ShardMap":
+        with open(os.path.join(path, "shards.bin"), "rb") as file:
+            state = pickle.load(file)
+        return cls(shard_count=state["shard_count"], strategy=state["strategy"])
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.exists(os.path.join(path, "shards.bin"))
+
+    def _hash(self, item_id: PointId) -> int:
+        return zlib.crc32(str(item_id).encode("utf-8")) % self.shard_count
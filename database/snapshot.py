@@ -0,0 +1,316 @@
+import os
+import json
+import time
+import shutil
+
+import numpy as np
+
+from typing import Callable, Dict, List, Optional
+
+from qdrant_client.http.models import ScoredPoint
+
+from embedder.base import BaseVectorizer
+from embedder.tfidf import TfIdf
+from preprocessor.lemmatizer import Lemmatizer
+from preprocessor.query_preparator import QueryPreparator
+from database.columns import ColumnStore, write_columns
+from database.filters import Conditions
+from database.fusion import fuse_scores
+from database.typeahead import PrefixIndex
+
+from utils import SNAPSHOTS_FOLDER, SNAPSHOT_KEEP, SIMILARITY_THRESHOLD, VECTOR_DTYPE
+
+
+class ReadOnlyError(Exception):
+    pass
+
+
+def current_generation(root: str) -> Optional[int]:
+    current_path = os.path.join(root, "CURRENT")
+    if not os.path.exists(current_path):
+        return None
+    with open(current_path, "r", encoding="utf-8") as file:
+        return int(file.read().strip())
+
+
+def generation_path(root: str, generation: int) -> str:
+    return os.path.join(root, f"{generation:06d}")
+
+
+def write_snapshot(database, path: str) -> None:
+    """Writes model, preparator and every collection of the database as
+    memory-mappable columns (database.columns.write_columns) into an
+    existing folder."""
+    database._model.save(os.path.join(path, "model"))
+    database._json_preparator.save(path)
+    if database._minhash is not None:
+        database._minhash.save(path)
+    if getattr(database, "_typeahead", None) is not None:
+        database._typeahead.save(path)
+    # Ids outside the fitted corpus, so compaction after an import keeps idf right
+    with open(os.path.join(path, "unfitted.json"), "w", encoding="utf-8") as file:
+        json.dump({name: list(ids) for name, ids in database._unfitted.items() if ids}, file)
+
+    manifest = database._snapshot_manifest()
+    for collection_name in manifest["collections"].values():
+        records = database._scroll_storage(
+            with_payload=True,
+            with_vectors=True,
+            collection_name=collection_name,
+        )
+        vectors = np.array([item.vector for item in records], dtype=VECTOR_DTYPE)
+        write_columns(
+            path,
+            collection_name,
+            ids=[item.id for item in records],
+            vectors=vectors.reshape(len(records), manifest["embedding_size"]),
+            payloads=[item.payload or {} for item in records],
+        )
+
+    manifest["created"] = time.time()
+    with open(os.path.join(path, "manifest.json"), "w", encoding="utf-8") as file:
+        json.dump(manifest, file)
+
+
+def publish_snapshot(database, keep: int = SNAPSHOT_KEEP) -> int:
+    # A generation becomes visible only when it is complete: the folder is
+    # renamed into place and CURRENT is replaced atomically afterwards
+    root = os.path.join(database._path, SNAPSHOTS_FOLDER)
+    if not os.path.exists(root):
+        os.makedirs(root)
+    generations = list_generations(root)
+    generation = (generations[-1] if generations else 0) + 1
+
+    tmp_path = os.path.join(root, f".tmp-{generation:06d}")
+    if os.path.exists(tmp_path):
+        shutil.rmtree(tmp_path)
+    os.makedirs(tmp_path)
+    write_snapshot(database, tmp_path)
+    os.rename(tmp_path, generation_path(root, generation))
+
+    current_path = os.path.join(root, "CURRENT")
+    with open(current_path + ".tmp", "w", encoding="utf-8") as file:
+        file.write(str(generation))
+    os.replace(current_path + ".tmp", current_path)
+
+    # Files of removed generations stay readable for replicas that still map them
+    for old in list_generations(root)[:-keep]:
+        shutil.rmtree(generation_path(root, old), ignore_errors=True)
+    return generation
+
+
+def list_generations(root: str) -> List[int]:
+    if not os.path.exists(root):
+        return []
+    return sorted(int(name) for name in os.listdir(root) if name.isdigit())
+
+
+class SnapshotState:
+    __slots__ = ("generation", "manifest", "preparator", "collections", "typeahead")
+
+    def __init__(
+        self,
+        generation: int,
+        manifest: Dict,
+        preparator: QueryPreparator,
+        collections: Dict[str, ColumnStore],
+        typeahead: Optional[PrefixIndex] = None,
+    ) -> None:
+        self.generation = generation
+        self.manifest = manifest
+        self.preparator = preparator
+        self.collections = collections
+        self.typeahead = typeahead
+
+
+class SnapshotReplica:
+    """Read-only view of the latest published snapshot of a database.
+
+    Vectors, ids, contents and metadata are memory mapped, so replicas in
+    different processes share the page cache. refresh() swaps to a newer generation in one reference
+    assignment; searches already running finish on the old one.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        model_factory: Callable[[], BaseVectorizer] = TfIdf,
+        lemmatizer: Optional[Lemmatizer] = None,
+    ) -> None:
+        self._root = os.path.join(path, SNAPSHOTS_FOLDER)
+        self._model_factory = model_factory
+        self._lemmatizer = lemmatizer if lemmatizer is not None else Lemmatizer()
+        self._state: Optional[SnapshotState] = None
+        if not self.refresh():
+            raise FileNotFoundError(f"No published snapshots in '{self._root}'")
+
+    @property
+    def generation(self) -> int:
+        return self._state.generation
+
+    @property
+    def memory_size(self) -> int:
+        return self._state.preparator._model.memory_size
+
+    def refresh(self) -> bool:
+        generation = current_generation(self._root)
+        if generation is None or (self._state is not None and generation == self._state.generation):
+            return False
+        self._state = self._load(generation)
+        return True
+
+    def search(self, query: str, limit: int = 5, query_filter: Optional[Conditions] = None) -> List[ScoredPoint]:
+        return self.search_many(queries=[query], limit=limit, query_filter=query_filter)[0]
+
+    def search_many(
+        self,
+        queries: List[str],
+        limit: int = 5,
+        query_filter: Optional[Conditions] = None,
+    ) -> List[List[ScoredPoint]]:
+        state = self._state
+        if not queries:
+            return []
+        query_vectors = state.preparator.process_batch(queries)
+        if state.manifest["kind"] != "faq":
+            return self._top(state, "documents", query_vectors, limit, query_filter=query_filter)
+
+        search = state.manifest["search"]
+        search_questions = self._top(state, "questions", query_vectors, limit, query_filter=query_filter)
+        search_answers = self._top(state, "answers", query_vectors, limit, query_filter=query_filter)
+        answers = state.collections["answers"]
+        results = []
+        for questions, answers in zip(search_questions, search_answers):
+            fused = fuse_scores(
+                results=(questions, answers),
+                weights=(search["question_weight"], 1 - search["question_weight"]),
+                method=search["fusion"],
+            )[:limit]
+            results.append([
+                ScoredPoint(
+                    id=item_id,
+                    version=state.generation,
+                    score=score,
+                    payload={"content": self._content(answers, item_id)},
+                )
+                for item_id, score in fused
+            ])
+        return results
+
+    def search_similar(
+        self,
+        query: str,
+        limit: int = 5,
+        score_threshold: float = SIMILARITY_THRESHOLD,
+        query_filter: Optional[Conditions] = None,
+    ) -> List[ScoredPoint]:
+        return self.search_similar_many(
+            queries=[query],
+            limit=limit,
+            score_threshold=score_threshold,
+            query_filter=query_filter,
+        )[0]
+
+    def search_similar_many(
+        self,
+        queries: List[str],
+        limit: int = 5,
+        score_threshold: float = SIMILARITY_THRESHOLD,
+        query_filter: Optional[Conditions] = None,
+    ) -> List[List[ScoredPoint]]:
+        state = self._state
+        if not queries:
+            return []
+        role = "answers" if state.manifest["kind"] == "faq" else "documents"
+        query_vectors = state.preparator.process_batch(queries)
+        return self._top(state, role, query_vectors, limit, score_threshold=score_threshold, query_filter=query_filter)
+
+    def suggest(self, prefix: str, limit: int = 5) -> List[ScoredPoint]:
+        state = self._state
+        if state.typeahead is None:
+            return []
+        return [
+            ScoredPoint(id=item_id, version=state.generation, score=weight, payload={"content": question})
+            for item_id, question, weight in state.typeahead.complete(prefix, limit=limit)
+        ]
+
+    def add_vectors(self, *args, **kwargs) -> None:
+        raise ReadOnlyError("Replica is read-only, write to the database owner")
+
+    def update_vectors(self, *args, **kwargs) -> None:
+        raise ReadOnlyError("Replica is read-only, write to the database owner")
+
+    def delete_vectors(self, *args, **kwargs) -> None:
+        raise ReadOnlyError("Replica is read-only, write to the database owner")
+
+    def delete_by_filter(self, *args, **kwargs) -> None:
+        raise ReadOnlyError("Replica is read-only, write to the database owner")
+
+    def compact(self, *args, **kwargs) -> None:
+        raise ReadOnlyError("Replica is read-only, write to the database owner")
+
+    def record_selection(self, *args, **kwargs) -> None:
+        raise ReadOnlyError("Replica is read-only, write to the database owner")
+
+    def publish_snapshot(self, *args, **kwargs) -> None:
+        raise ReadOnlyError("Replica is read-only, publish from the database owner")
+
+    def _load(self, generation: int) -> SnapshotState:
+        path = generation_path(self._root, generation)
+        with open(os.path.join(path, "manifest.json"), "r", encoding="utf-8") as file:
+            manifest = json.load(file)
+
+        model = self._model_factory()
+        model.load(os.path.join(path, "model"))
+
+        return SnapshotState(
+            generation=generation,
+            manifest=manifest,
+            preparator=QueryPreparator(model=model, lemmatizer=self._lemmatizer),
+            collections={
+                role: ColumnStore(path, collection_name)
+                for role, collection_name in manifest["collections"].items()
+            },
+            typeahead=PrefixIndex.load(path) if PrefixIndex.exists(path) else None,
+        )
+
+    @staticmethod
+    def _content(store: ColumnStore, item_id: int) -> Optional[str]:
+        position = store.position(item_id)
+        return store.content(position) if position is not None else None
+
+    @staticmethod
+    def _top(
+        state: SnapshotState,
+        role: str,
+        query_vectors: np.ndarray,
+        limit: int,
+        score_threshold: Optional[float] = None,
+        query_filter: Optional[Conditions] = None,
+    ) -> List[List[ScoredPoint]]:
+        store = state.collections[role]
+        if not len(store) or limit <= 0:
+            return [[] for _ in range(len(query_vectors))]
+
+        # Vectors are L2-normalized, so the dot product is the cosine similarity
+        scores = np.asarray(query_vectors, dtype=VECTOR_DTYPE) @ store.vectors.T
+        if query_filter:
+            if not isinstance(query_filter, dict):
+                raise TypeError("Replicas accept filter conditions as a dict")
+            scores[:, ~store.mask(query_filter)] = -np.inf
+        k = min(limit, len(store))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, candidates in enumerate(top):
+            order = candidates[np.argsort(-scores[row, candidates])]
+            results.append([
+                ScoredPoint(
+                    id=store.id_at(i),
+                    version=state.generation,
+                    score=float(scores[row, i]),
+                    payload=store.payload(i),
+                )
+                for i in order
+                if np.isfinite(scores[row, i]) and (score_threshold is None or scores[row, i] >= score_threshold)
+            ])
+        return results
@@ -0,0 +1,292 @@
+import os
+import re
+import sys
+import heapq
+import pickle
+import threading
+from bisect import bisect_left
+from operator import itemgetter
+
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from utils import TYPEAHEAD_CACHED_PREFIX, TYPEAHEAD_CACHE_SIZE
+
+PointId = Union[int, str]
+
+SPACES = re.compile(r"\s+")
+MAX_CHAR = "\uffff"
+# Batches with more keys are merged into the sorted array in one pass
+# instead of being inserted one by one
+INSERT_LIMIT = 32
+
+
+def normalize(text: str) -> str:
+    return SPACES.sub(" ", text.lower().replace("ё", "е")).strip()
+
+
+class PrefixIndex:
+    """Completion of typed prefixes into FAQ questions.
+
+    Every question is stored under keys that start at each of its words, both
+    in surface form and as lemmas, in one sorted array. A prefix maps to a
+    contiguous range of that array found by binary search; matches are ranked
+    by popularity weight, questions matched from their first word go first.
+    Top completions of short prefixes, whose ranges are long, are cached and
+    kept up to date as questions are added and picked.
+
+    Once attached to a folder, every change is appended to typeahead.journal
+    there; load() replays it over the last full save().
+    """
+
+    def __init__(self) -> None:
+        self._keys: List[str] = []
+        self._ids: List[PointId] = []
+        self._texts: Dict[PointId, str] = {}
+        self._item_keys: Dict[PointId, List[str]] = {}
+        self._starts: Dict[PointId, Set[str]] = {}
+        self._weights: Dict[PointId, float] = {}
+        self._cache: Dict[str, List[PointId]] = {}
+        self._lock = threading.RLock()
+        self._journal: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def __contains__(self, item_id: PointId) -> bool:
+        return item_id in self._texts
+
+    @property
+    def memory_size(self) -> int:
+        # Keys and question texts dominate, ids and weights are pointers
+        keys_size = sum(sys.getsizeof(key) for key in self._keys)
+        texts_size = sum(sys.getsizeof(text) for text in self._texts.values())
+        return keys_size + texts_size + 8 * 2 * len(self._keys)
+
+    def add(self, item_id: PointId, text: str, lemmas: Optional[List[str]] = None) -> None:
+        self.add_many([(item_id, text, lemmas)])
+
+    def add_many(self, items: Iterable[Tuple[PointId, str, Optional[List[str]]]]) -> None:
+        """Adds or replaces (id, text, lemmas) items. Keys of a large batch are
+        sorted once and merged into the array, after which the short prefix
+        cache is rebuilt in the same pass."""
+        items = list(items)
+        with self._lock:
+            self._add_many(items)
+            self._log(("add", items))
+
+    def remove(self, item_id: PointId, keep_weight: bool = False) -> bool:
+        with self._lock:
+            removed = self._remove(item_id, keep_weight=keep_weight)
+            if removed:
+                self._log(("remove", item_id, keep_weight))
+            return removed
+
+    def add_weight(self, item_id: PointId, weight: float = 1.) -> None:
+        with self._lock:
+            if self._add_weight(item_id, weight):
+                self._log(("weight", item_id, weight))
+
+    def complete(self, prefix: str, limit: int = 5) -> List[Tuple[PointId, str, float]]:
+        prefix = normalize(prefix)
+        if not prefix or limit <= 0:
+            return []
+        with self._lock:
+            cacheable = len(prefix) <= TYPEAHEAD_CACHED_PREFIX and limit <= TYPEAHEAD_CACHE_SIZE
+            ids = self._cache.get(prefix) if cacheable else None
+            if ids is None:
+                ids = self._rank(prefix, TYPEAHEAD_CACHE_SIZE if cacheable else limit)
+                if cacheable:
+                    self._cache[prefix] = ids
+            return [(item_id, self._texts[item_id], self._weights[item_id]) for item_id in ids[:limit]]
+
+    def attach(self, path: str) -> None:
+        self._journal = os.path.join(path, "typeahead.journal")
+
+    def save(self, path: str) -> None:
+        with self._lock:
+            tmp_path = os.path.join(path, "typeahead.bin.tmp")
+            with open(tmp_path, "wb") as file:
+                pickle.dump(self, file)
+            os.replace(tmp_path, os.path.join(path, "typeahead.bin"))
+            # The full copy covers everything journaled in this folder so far
+            journal = os.path.join(path, "typeahead.journal")
+            if journal == self._journal and os.path.exists(journal):
+                os.remove(journal)
+
+    @classmethod
+    def load(cls, path: str) -> "PrefixIndex":
+        with open(os.path.join(path, "typeahead.bin"), "rb") as file:
+            obj = pickle.load(file)
+        journal = os.path.join(path, "typeahead.journal")
+        if os.path.exists(journal):
+            with open(journal, "rb") as file:
+                while True:
+                    try:
+                        entry = pickle.load(file)
+                    except EOFError:
+                        break
+                    if entry[0] == "add":
+                        obj._add_many(entry[1])
+                    elif entry[0] == "remove":
+                        obj._remove(entry[1], keep_weight=entry[2])
+                    else:
+                        obj._add_weight(entry[1], entry[2])
+        obj.attach(path)
+        return obj
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.exists(os.path.join(path, "typeahead.bin"))
+
+    def __getstate__(self) -> Dict:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        state["_cache"] = {}
+        state["_journal"] = None
+        return state
+
+    def __setstate__(self, state: Dict) -> None:
+        state.setdefault("_journal", None)
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+        self._warm_cache()
+
+    def _add_many(self, items: List[Tuple[PointId, str, Optional[List[str]]]]) -> None:
+        batch = {item_id: (text, *self._question_keys(text, lemmas)) for item_id, text, lemmas in items}
+        pairs = [(key, item_id) for item_id, (_, keys, _) in batch.items() for key in keys]
+        if len(pairs) <= INSERT_LIMIT:
+            for item_id, (text, keys, starts) in batch.items():
+                self._remove(item_id, keep_weight=True)
+                self._register(item_id, text, keys, starts)
+                for key in keys:
+                    position = bisect_left(self._keys, key)
+                    self._keys.insert(position, key)
+                    self._ids.insert(position, item_id)
+                self._offer(item_id)
+            return
+
+        replaced = {item_id for item_id in batch if item_id in self._item_keys}
+        kept = [
+            (key, item_id)
+            for key, item_id in zip(self._keys, self._ids)
+            if item_id not in replaced
+        ]
+        for item_id, (text, keys, starts) in batch.items():
+            self._register(item_id, text, keys, starts)
+        pairs.sort(key=itemgetter(0))
+        merged = list(heapq.merge(kept, pairs, key=itemgetter(0))) if kept else pairs
+        self._keys = [key for key, _ in merged]
+        self._ids = [item_id for _, item_id in merged]
+        self._warm_cache()
+
+    def _remove(self, item_id: PointId, keep_weight: bool) -> bool:
+        keys = self._item_keys.pop(item_id, None)
+        if keys is None:
+            return False
+        for key in keys:
+            position = bisect_left(self._keys, key)
+            while self._keys[position] == key and self._ids[position] != item_id:
+                position += 1
+            del self._keys[position]
+            del self._ids[position]
+        del self._texts[item_id]
+        del self._starts[item_id]
+        if not keep_weight:
+            self._weights.pop(item_id, None)
+        self._forget(item_id, keys)
+        return True
+
+    def _add_weight(self, item_id: PointId, weight: float) -> bool:
+        if item_id not in self._texts:
+            return False
+        self._weights[item_id] = self._weights.get(item_id, 1.) + weight
+        if weight >= 0:
+            self._offer(item_id)
+        else:
+            self._invalidate(self._item_keys[item_id])
+        return True
+
+    def _log(self, entry: Tuple) -> None:
+        if self._journal is not None:
+            with open(self._journal, "ab") as file:
+                pickle.dump(entry, file)
+
+    def _register(self, item_id: PointId, text: str, keys: List[str], starts: Set[str]) -> None:
+        self._texts[item_id] = text
+        self._item_keys[item_id] = keys
+        self._starts[item_id] = starts
+        self._weights.setdefault(item_id, 1.)
+
+    def _question_keys(self, text: str, lemmas: Optional[List[str]]) -> Tuple[List[str], Set[str]]:
+        surface = normalize(text)
+        starts = {surface}
+        keys = self._word_keys(surface)
+        if lemmas:
+            lemma_text = normalize(" ".join(lemmas))
+            starts.add(lemma_text)
+            keys.extend(self._word_keys(lemma_text))
+        return sorted(set(key for key in keys if key)), starts
+
+    def _ranking(self, prefix: str) -> Callable[[PointId], Tuple]:
+        return lambda item_id: (
+            self._weights[item_id],
+            any(text.startswith(prefix) for text in self._starts[item_id]),
+            -len(self._texts[item_id]),
+        )
+
+    def _rank(self, prefix: str, limit: int) -> List[PointId]:
+        start = bisect_left(self._keys, prefix)
+        end = bisect_left(self._keys, prefix + MAX_CHAR, lo=start)
+        return heapq.nlargest(limit, set(self._ids[start:end]), key=self._ranking(prefix))
+
+    def _warm_cache(self) -> None:
+        # One pass over the array ranks every short prefix, so completions of
+        # one or two letters never scan a large part of the index
+        candidates: Dict[str, Set[PointId]] = {}
+        for key, item_id in zip(self._keys, self._ids):
+            for size in range(1, min(len(key), TYPEAHEAD_CACHED_PREFIX) + 1):
+                candidates.setdefault(key[:size], set()).add(item_id)
+        self._cache = {
+            prefix: heapq.nlargest(TYPEAHEAD_CACHE_SIZE, ids, key=self._ranking(prefix))
+            for prefix, ids in candidates.items()
+        }
+
+    def _offer(self, item_id: PointId) -> None:
+        # A new or heavier item can only push others down the cached top lists
+        for prefix in self._short_prefixes(self._item_keys[item_id]):
+            ids = self._cache.get(prefix)
+            if ids is None:
+                continue
+            if item_id not in ids:
+                ids.append(item_id)
+            ids.sort(key=self._ranking(prefix), reverse=True)
+            del ids[TYPEAHEAD_CACHE_SIZE:]
+
+    def _forget(self, item_id: PointId, keys: List[str]) -> None:
+        for prefix in self._short_prefixes(keys):
+            ids = self._cache.get(prefix)
+            if ids is None or item_id not in ids:
+                continue
+            if len(ids) < TYPEAHEAD_CACHE_SIZE:
+                ids.remove(item_id)
+            else:
+                # The next candidate is outside the list, ranked again on demand
+                del self._cache[prefix]
+
+    def _invalidate(self, keys: List[str]) -> None:
+        for prefix in self._short_prefixes(keys):
+            self._cache.pop(prefix, None)
+
+    @staticmethod
+    def _short_prefixes(keys: List[str]) -> Set[str]:
+        return {
+            key[:size]
+            for key in keys
+            for size in range(1, min(len(key), TYPEAHEAD_CACHED_PREFIX) + 1)
+        }
+
+    @staticmethod
+    def _word_keys(text: str) -> List[str]:
+        if not text:
+            return []
+        return [text] + [text[i + 1:] for i, char in enumerate(text) if char == " "]
@@ -1,7 +1,11 @@
 from abc import ABC, abstractmethod, abstractproperty
 from pathlib import Path
 
-from typing import List, Union, Tuple
+from typing import Dict, List, Union
+
+import numpy as np
+
+from utils import VECTOR_DTYPE
 
 
 class BaseVectorizer(ABC):
@@ -15,8 +19,14 @@ class BaseVectorizer(ABC):
         pass
     
     @abstractmethod
-    def transform(self, text: List[str]) -> List[float]:
+    def transform(self, text: List[str]) -> np.ndarray:
         pass
+
+    def transform_batch(self, corpus: List[List[str]]) -> np.ndarray:
+        # Vectorizers should override it with a vectorized version
+        if not corpus:
+            return np.zeros((0, self.embedding_size), dtype=VECTOR_DTYPE)
+        return np.vstack([self.transform(text) for text in corpus])
     
     @abstractmethod
     def save(self, path: Path) -> None:
@@ -34,13 +44,17 @@ class BaseVectorizer(ABC):
     def embedding_size(self) -> int:
         pass
 
+    def remove_documents(self, corpus: List[List[str]]) -> None:
+        # Vectorizers with corpus statistics should forget deleted documents here
+        pass
+
+    @property
+    def params(self) -> Dict:
+        # Settings that change the fitted model, used to tell builds apart
+        return {}
+
+    @property
+    def memory_size(self) -> int:
+        # Rough estimate of bytes held by the fitted model, used for eviction budgets
+        return 0
 
-class SparseToDenseConverter():
-    def __init__(self, embedding_size: int) -> None:
-        self.embedding_size = embedding_size
-    
-    def convert(self, sparse_vector: List[Tuple[int, float]]) -> List[float]:
-        vector = [0.] * self.embedding_size
-        for i, value in sparse_vector:
-            vector[i] = value
-        return vector
\ No newline at end of file
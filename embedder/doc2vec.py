@@ -1,6 +1,8 @@
 from pathlib import Path
 from typing import List, Union
 
+import numpy as np
+
 from embedder.base import BaseVectorizer
 
 class Doc2Vector(BaseVectorizer):
@@ -12,7 +14,7 @@ class Doc2Vector(BaseVectorizer):
     def fit(self, corpus: List[List[str]]) -> None:
         pass
     
-    def transform(self, text: List[str]) -> List[float]:
+    def transform(self, text: List[str]) -> np.ndarray:
         pass
     
     def save(self) -> None:
@@ -1,42 +1,213 @@
 import os
-from typing import List, Union
+import sys
+import json
+import time
+from typing import Dict, List, Optional, Union
+
+import numpy as np
 from gensim import corpora, models
+from gensim.models.tfidfmodel import precompute_idfs
+from gensim.utils import SaveLoad
+from scipy.sparse import csr_matrix
+
+from embedder.base import BaseVectorizer
+from utils import VECTOR_DTYPE
+
+# token2id, dfs, cfs and idfs entries kept per dictionary term
+TERM_OVERHEAD_BYTES = 4 * 100
+# Documents used to measure transform latency after fit
+LATENCY_SAMPLE_SIZE = 100
 
-from embedder.base import BaseVectorizer, SparseToDenseConverter
 
 class TfIdf(BaseVectorizer):
-    def __init__(self) -> None:
+    """TF-IDF vectorizer over a gensim dictionary.
+
+    Vocabulary is controlled by no_below (min document count), no_above
+    (max document fraction), keep_n (most frequent terms kept) and
+    drop_numbers. With hash_size set, terms are hashed into a fixed number
+    of dimensions instead, so the embedding size does not grow with the corpus.
+    """
+
+    def __init__(
+        self,
+        no_below: int = 1,
+        no_above: float = 1.0,
+        keep_n: Optional[int] = None,
+        drop_numbers: bool = False,
+        hash_size: Optional[int] = None,
+    ) -> None:
         self.save_folder = "tfidf"
-    
+        self._no_below = no_below
+        self._no_above = no_above
+        self._keep_n = keep_n
+        self._drop_numbers = drop_numbers
+        self._hash_size = hash_size
+        self.vocabulary_stats: Dict[str, float] = {}
+
     def fit(self, corpus: List[List[str]]) -> None:
-        self._dictionary = corpora.Dictionary(corpus)
-        self._embedding_size = len(self._dictionary.token2id)
-        self._converter = SparseToDenseConverter(embedding_size=self._embedding_size)
+        if self._hash_size:
+            self._dictionary = corpora.HashDictionary(corpus, id_range=self._hash_size, debug=False)
+        else:
+            self._dictionary = corpora.Dictionary(corpus)
+        raw_vocabulary_size = len(self._dictionary.dfs)
+        self._prune_vocabulary()
+
+        self._embedding_size = self._dictionary_size()
 
         corpus_vectorized = [self._dictionary.doc2bow(text) for text in corpus]
         self._model = models.TfidfModel(corpus_vectorized)
-    
-    def transform(self, text: List[str]) -> List[float]:
-        kw_vector = self._dictionary.doc2bow(text)
-        tfidf_vector = self._model[kw_vector]
-        return self._converter.convert(sparse_vector=tfidf_vector)
-    
+        self._idf = self._idf_vector()
+        self._collect_stats(corpus=corpus, raw_vocabulary_size=raw_vocabulary_size)
+
+    def transform(self, text: List[str]) -> np.ndarray:
+        return self.transform_batch([text])[0]
+
+    def transform_batch(self, corpus: List[List[str]]) -> np.ndarray:
+        return self.transform_batch_sparse(corpus).toarray()
+
+    def transform_batch_sparse(self, corpus: List[List[str]]) -> csr_matrix:
+        # Same weighting as TfidfModel (raw term count * idf, L2 norm) done
+        # over the whole corpus at once instead of doc2bow per document
+        lengths = np.fromiter((len(text) for text in corpus), dtype=np.int64, count=len(corpus))
+        term_ids = np.array(self._term_ids([token for text in corpus for token in text]), dtype=np.int64)
+        rows = np.repeat(np.arange(len(corpus)), lengths)
+        known = term_ids >= 0
+
+        matrix = csr_matrix(
+            (np.ones(int(known.sum()), dtype=VECTOR_DTYPE), (rows[known], term_ids[known])),
+            shape=(len(corpus), self._embedding_size),
+            dtype=VECTOR_DTYPE,
+        )
+        matrix.sum_duplicates()
+        matrix.data *= self._idf[matrix.indices]
+        matrix.eliminate_zeros()
+
+        squared = matrix.copy()
+        squared.data **= 2
+        norms = np.sqrt(np.asarray(squared.sum(axis=1)).ravel())
+        norms[norms == 0] = 1.
+        matrix.data /= np.repeat(norms, np.diff(matrix.indptr)).astype(VECTOR_DTYPE)
+        return matrix
+
+    def remove_documents(self, corpus: List[List[str]]) -> None:
+        # Document frequencies and idf as if the documents were never in the
+        # corpus; vectors already stored keep their old weights until a refit
+        if not corpus:
+            return
+        for text in corpus:
+            for term_id in set(self._term_ids(text)):
+                if term_id < 0:
+                    continue
+                for dfs in (self._model.dfs, self._dictionary.dfs):
+                    if dfs.get(term_id, 0) > 1:
+                        dfs[term_id] -= 1
+                    else:
+                        dfs.pop(term_id, None)
+        self._model.num_docs = max(self._model.num_docs - len(corpus), 0)
+        self._dictionary.num_docs = max(self._dictionary.num_docs - len(corpus), 0)
+        self._model.idfs = precompute_idfs(self._model.wglobal, self._model.dfs, self._model.num_docs)
+        self._idf = self._idf_vector()
+
     def save(self, path: str) -> None:
         if not os.path.exists(os.path.join(path, self.save_folder)):
             os.makedirs(os.path.join(path, self.save_folder))
-        
+
         self._dictionary.save(os.path.join(path, self.save_folder, "dictionary.bin"))
         self._model.save(os.path.join(path, self.save_folder, "model.bin"))
-    
+        with open(os.path.join(path, self.save_folder, "config.json"), "w", encoding="utf-8") as file:
+            json.dump(self._config(), file)
+
     def load(self, path: str) -> None:
-        self._dictionary = corpora.Dictionary.load(os.path.join(path, self.save_folder, "dictionary.bin"))
-        self._embedding_size = len(self._dictionary.token2id)
-        self._converter = SparseToDenseConverter(embedding_size=self._embedding_size)
+        config_path = os.path.join(path, self.save_folder, "config.json")
+        if os.path.exists(config_path):
+            # The saved dictionary was pruned with these settings, so refits keep them
+            with open(config_path, "r", encoding="utf-8") as file:
+                self._set_config(json.load(file))
+
+        self._dictionary = SaveLoad.load(os.path.join(path, self.save_folder, "dictionary.bin"))
+        self._embedding_size = self._dictionary_size()
         self._model = models.TfidfModel.load(os.path.join(path, self.save_folder, "model.bin"))
-    
+        self._idf = self._idf_vector()
+
     @property
     def embedding_size(self):
         return self._embedding_size
-    
+
+    @property
+    def params(self) -> Dict:
+        return self._config()
+
+    @property
+    def memory_size(self) -> int:
+        if not hasattr(self, "_dictionary"):
+            return 0
+        tokens_size = sum(sys.getsizeof(token) for token in getattr(self._dictionary, "token2id", {}))
+        return tokens_size + TERM_OVERHEAD_BYTES * len(self._dictionary.dfs)
+
     def _is_exists(self, path: str) -> bool:
-        pass
\ No newline at end of file
+        pass
+
+    def _prune_vocabulary(self) -> None:
+        if self._drop_numbers and not self._hash_size:
+            self._dictionary.filter_tokens(
+                bad_ids=[
+                    token_id for token, token_id in self._dictionary.token2id.items()
+                    if token.isdigit()
+                ]
+            )
+        if self._no_below > 1 or self._no_above < 1.0 or self._keep_n:
+            self._dictionary.filter_extremes(
+                no_below=self._no_below,
+                no_above=self._no_above,
+                keep_n=self._keep_n,
+            )
+
+    def _term_ids(self, tokens: List[str]) -> List[int]:
+        if isinstance(self._dictionary, corpora.HashDictionary):
+            return [self._dictionary.restricted_hash(token) for token in tokens]
+        token2id = self._dictionary.token2id
+        return [token2id.get(token, -1) for token in tokens]
+
+    def _idf_vector(self) -> np.ndarray:
+        idf = np.zeros(self._embedding_size, dtype=VECTOR_DTYPE)
+        if self._model.idfs:
+            term_ids, values = zip(*self._model.idfs.items())
+            idf[list(term_ids)] = values
+        return idf
+
+    def _dictionary_size(self) -> int:
+        if isinstance(self._dictionary, corpora.HashDictionary):
+            return self._dictionary.id_range
+        return len(self._dictionary.token2id)
+
+    def _collect_stats(self, corpus: List[List[str]], raw_vocabulary_size: int) -> None:
+        sample = corpus[:LATENCY_SAMPLE_SIZE]
+        started = time.perf_counter()
+        self.transform_batch(sample)
+        elapsed = time.perf_counter() - started
+
+        bytes_per_vector = self._embedding_size * np.dtype(VECTOR_DTYPE).itemsize
+        self.vocabulary_stats = {
+            "raw_vocabulary_size": raw_vocabulary_size,
+            "vocabulary_size": len(self._dictionary.dfs),
+            "embedding_size": self._embedding_size,
+            "bytes_per_vector": bytes_per_vector,
+            "index_bytes": bytes_per_vector * len(corpus),
+            "transform_ms": 1000 * elapsed / len(sample) if sample else 0.,
+        }
+
+    def _config(self) -> Dict:
+        return {
+            "no_below": self._no_below,
+            "no_above": self._no_above,
+            "keep_n": self._keep_n,
+            "drop_numbers": self._drop_numbers,
+            "hash_size": self._hash_size,
+        }
+
+    def _set_config(self, config: Dict) -> None:
+        self._no_below = config.get("no_below", 1)
+        self._no_above = config.get("no_above", 1.0)
+        self._keep_n = config.get("keep_n")
+        self._drop_numbers = config.get("drop_numbers", False)
+        self._hash_size = config.get("hash_size")
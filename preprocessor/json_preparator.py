@@ -1,12 +1,15 @@
 import os
 from abc import ABC, abstractmethod, abstractstaticmethod, abstractclassmethod
 import pickle
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 from utils import  InfoObject, InfoDocumentObject
 
 
 class BaseJsonPreparator(ABC):
+    # Source field -> payload index type ("keyword", "integer", "float", "bool", "text")
+    metadata_fields: Dict[str, str] = {}
+
     @abstractmethod
     def convert_json(self, json: List[dict]) -> List:
         pass
@@ -28,11 +31,30 @@ class BaseJsonPreparator(ABC):
             preparator_dict = pickle.load(file)
         return preparator_dict
 
+    def _set_metadata_fields(self, metadata_fields: Optional[Dict[str, str]]) -> None:
+        if metadata_fields and "content" in metadata_fields:
+            raise ValueError("'content' is reserved for the indexed text")
+        self.metadata_fields = dict(metadata_fields or {})
+
+    def _get_metadata(self, item: dict) -> Optional[Dict]:
+        metadata = {
+            field: item[field]
+            for field in self.metadata_fields
+            if item.get(field) is not None
+        }
+        return metadata or None
+
 
 class JsonPreparator(BaseJsonPreparator):
-    def __init__(self, id_field: str, content_field: str) -> None:
+    def __init__(
+        self,
+        id_field: str,
+        content_field: str,
+        metadata_fields: Optional[Dict[str, str]] = None,
+    ) -> None:
         self._id = id_field
         self._content = content_field
+        self._set_metadata_fields(metadata_fields)
     
     def convert_json(self, json: List[dict]) -> List[InfoDocumentObject]:
         filtered = []
@@ -44,6 +66,7 @@ class JsonPreparator(BaseJsonPreparator):
                     InfoDocumentObject(
                         id=item_id,
                         content=content,
+                        metadata=self._get_metadata(item),
                     )
                 )
         return filtered
@@ -71,10 +94,17 @@ class JsonPreparator(BaseJsonPreparator):
                 
                 
 class FAQJsonPreparator(BaseJsonPreparator):
-    def __init__(self, id_field: str, question_field: str, answer_field: str) -> None:
+    def __init__(
+        self,
+        id_field: str,
+        question_field: str,
+        answer_field: str,
+        metadata_fields: Optional[Dict[str, str]] = None,
+    ) -> None:
         self._id = id_field
         self._question = question_field
         self._answer = answer_field
+        self._set_metadata_fields(metadata_fields)
     
     def convert_json(self, json: List[dict]) -> List[InfoObject]:
         filtered = []
@@ -88,6 +118,7 @@ class FAQJsonPreparator(BaseJsonPreparator):
                         id=item_id,
                         question=question,
                         answer=answer,
+                        metadata=self._get_metadata(item),
                     )
                 )
         return filtered
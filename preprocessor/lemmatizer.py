@@ -21,7 +21,7 @@ class Lemmatizer(Tokenizer):
     
     def _load_stopwords(self):
         with open("russian", "r", encoding="utf-8") as file:
-            stopwords = file.read().split('\n')[:-1]
+            stopwords = set(file.read().split('\n')[:-1])
         return stopwords
     
     def _remove_stopwords(self, tokens: List[str]) -> List[str]:
@@ -1,17 +1,22 @@
 from preprocessor.lemmatizer import Lemmatizer
 
-from typing import List
+from typing import List, Optional
+
+import numpy as np
 
 
 class QueryPreparator:
-    def __init__(self, model) -> None:
-        self._lemmatizer = Lemmatizer()
+    def __init__(self, model, lemmatizer: Optional[Lemmatizer] = None) -> None:
+        self._lemmatizer = lemmatizer if lemmatizer is not None else Lemmatizer()
         self._model = model
 
-    def process(self, text: str) -> List[float]:
+    def process(self, text: str) -> np.ndarray:
         lemmatized_text = self._lemmatizer.process(text=text)
         return self._model.transform(lemmatized_text)
     
+    def process_batch(self, texts: List[str]) -> np.ndarray:
+        return self._model.transform_batch([self._lemmatizer.process(text=text) for text in texts])
+
     def lemmatize(self, text: str) -> List[str]:
         return self._lemmatizer.process(text=text)
         
\ No newline at end of file
@@ -0,0 +1,193 @@
+import json
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from typing import Any, Dict, Tuple
+
+from database.qdrant import SingletonQdrant
+from database.querylog import QueryLogger
+from database.registry import DatabaseRegistry
+from database.snapshot import ReadOnlyError
+from server.batcher import RequestBatcher, Overloaded
+
+from utils import BATCH_WINDOW_MS, MAX_BATCH_SIZE, MAX_PENDING_REQUESTS, REGISTRY_MEMORY_BUDGET, QUERY_LOG_SAMPLE_RATE
+
+REQUEST_TIMEOUT = 30.
+
+REQUIRED_FIELDS = {
+    "search": ("query",),
+    "search_similar": ("query",),
+    "suggest": ("prefix",),
+    "select": ("id",),
+    "add": ("items",),
+    "update": ("items",),
+    "delete": ("ids",),
+    "delete_by_filter": ("filter",),
+    "compact": (),
+    "publish": (),
+}
+
+
+def to_json(result: Any) -> Any:
+    if isinstance(result, list):
+        return [to_json(item) for item in result]
+    if isinstance(result, set):
+        return sorted(result)
+    if hasattr(result, "score"):
+        return {"id": result.id, "score": result.score, "payload": result.payload}
+    return result
+
+
+class SearchRequestHandler(BaseHTTPRequestHandler):
+    """POST /<operation> with JSON body {"database": name, ...}, GET /stats."""
+
+    server: "SearchServer"
+
+    def do_GET(self) -> None:
+        if self.path.rstrip("/") == "/stats":
+            self._reply(200, self.server.batcher.stats.summary())
+        else:
+            self._reply(404, {"error": "Not found"})
+
+    def do_POST(self) -> None:
+        operation = self.path.strip("/")
+        if operation not in REQUIRED_FIELDS:
+            self._reply(404, {"error": f"Unknown operation '{operation}'"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._reply(400, {"error": "Body must be JSON"})
+            return
+        missing = [field for field in ("database",) + REQUIRED_FIELDS[operation] if field not in payload]
+        if missing:
+            self._reply(400, {"error": f"Missing fields: {', '.join(missing)}"})
+            return
+
+        try:
+            result = self.server.batcher.submit(
+                database=payload["database"],
+                operation=operation,
+                payload=payload,
+                timeout=REQUEST_TIMEOUT,
+            )
+        except Overloaded as error:
+            self._reply(503, {"error": str(error)})
+        except TimeoutError as error:
+            self._reply(504, {"error": str(error)})
+        except (KeyError, FileNotFoundError) as error:
+            self._reply(404, {"error": str(error)})
+        except ReadOnlyError as error:
+            self._reply(405, {"error": str(error)})
+        except Exception as error:
+            self._reply(500, {"error": str(error)})
+        else:
+            self._reply(200, {"result": to_json(result)})
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _reply(self, status: int, body: Dict) -> None:
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class SearchServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], batcher: RequestBatcher) -> None:
+        super().__init__(address, SearchRequestHandler)
+        self.batcher = batcher
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Local search server over vector databases")
+    parser.add_argument("--path", required=True, help="Vector index folder")
+    parser.add_argument(
+        "--database",
+        action="append",
+        default=[],
+        help="Database to serve: 'name' or 'name:questions_collection:answers_collection' for FAQ",
+    )
+    parser.add_argument("--warm", action="append", default=[], help="Database to load at startup")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--memory-budget", type=int, default=REGISTRY_MEMORY_BUDGET)
+    parser.add_argument("--window-ms", type=float, default=BATCH_WINDOW_MS)
+    parser.add_argument("--max-batch-size", type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument("--max-pending", type=int, default=MAX_PENDING_REQUESTS)
+    parser.add_argument(
+        "--compact-interval",
+        type=float,
+        default=0.,
+        help="Seconds between background compactions of soft deletes, 0 to disable",
+    )
+    parser.add_argument("--query-log", help="JSON-lines file to append sampled searches to, for server.replay")
+    parser.add_argument("--query-log-sample", type=float, default=QUERY_LOG_SAMPLE_RATE)
+    return parser.parse_args()
+
+
+def run_compaction(registry: DatabaseRegistry, batcher: RequestBatcher, interval: float, stop: threading.Event) -> None:
+    # Goes through the batcher, so compaction is ordered with other writes
+    while not stop.wait(interval):
+        for name in registry.loaded:
+            try:
+                batcher.submit(database=name, operation="compact", payload={}, timeout=REQUEST_TIMEOUT)
+            except Exception:
+                pass
+
+
+def main() -> None:
+    args = parse_args()
+    query_logger = QueryLogger(args.query_log, sample_rate=args.query_log_sample) if args.query_log else None
+    registry = DatabaseRegistry(
+        index=SingletonQdrant(path=args.path),
+        memory_budget=args.memory_budget,
+        query_logger=query_logger,
+    )
+    for spec in args.database:
+        name, *collections = spec.split(":")
+        if collections and len(collections) != 2:
+            raise SystemExit(f"FAQ database spec must be 'name:questions:answers', got '{spec}'")
+        registry.register(name, *collections)
+    registry.warm(args.warm)
+
+    batcher = RequestBatcher(
+        registry=registry,
+        window_ms=args.window_ms,
+        max_batch_size=args.max_batch_size,
+        max_pending=args.max_pending,
+        start=False,
+    )
+    server = SearchServer((args.host, args.port), batcher)
+    threading.Thread(target=server.serve_forever, name="http", daemon=True).start()
+    stop = threading.Event()
+    if args.compact_interval > 0:
+        threading.Thread(
+            target=run_compaction,
+            args=(registry, batcher, args.compact_interval, stop),
+            name="compaction",
+            daemon=True,
+        ).start()
+    try:
+        # The index client was opened in this thread, so the dispatcher runs here
+        batcher.serve()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.shutdown()
+        server.server_close()
+        if query_logger is not None:
+            query_logger.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+import json
+import time
+import threading
+from collections import defaultdict, deque
+from queue import Queue, Empty, Full
+
+import numpy as np
+
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, List, Optional, Tuple, Union
+
+from database.registry import DatabaseRegistry
+from database.qdrant import QdrantDatabase
+
+if TYPE_CHECKING:
+    from server.replicas import ReplicaRegistry
+
+from utils import BATCH_WINDOW_MS, MAX_BATCH_SIZE, MAX_PENDING_REQUESTS, LATENCY_WINDOW, SIMILARITY_THRESHOLD
+
+
+# In-memory reads answered in the calling thread, without the batching window
+INLINE_OPERATIONS = ("suggest",)
+
+
+class Overloaded(Exception):
+    pass
+
+
+class Request:
+    __slots__ = ("database", "operation", "payload", "result", "error", "done", "created")
+
+    def __init__(self, database: str, operation: str, payload: Dict) -> None:
+        self.database = database
+        self.operation = operation
+        self.payload = payload
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.done = threading.Event()
+        self.created = time.perf_counter()
+
+
+class LatencyStats:
+    def __init__(self, window: int = LATENCY_WINDOW) -> None:
+        self._window = window
+        self._latencies: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=self._window))
+        self._counts: Dict[str, int] = defaultdict(int)
+        self._errors: Dict[str, int] = defaultdict(int)
+        self.rejected = 0
+        self.batches = 0
+        self.batched_requests = 0
+        self._lock = threading.Lock()
+
+    def record(self, operation: str, latency: float, failed: bool = False) -> None:
+        with self._lock:
+            self._latencies[operation].append(latency)
+            self._counts[operation] += 1
+            if failed:
+                self._errors[operation] += 1
+
+    def record_batch(self, size: int) -> None:
+        with self._lock:
+            self.batches += 1
+            self.batched_requests += size
+
+    def record_rejected(self) -> None:
+        with self._lock:
+            self.rejected += 1
+
+    def summary(self) -> Dict:
+        with self._lock:
+            operations = {}
+            for operation, latencies in self._latencies.items():
+                values = np.array(latencies) * 1000
+                p50, p90, p99 = np.percentile(values, [50, 90, 99]) if len(values) else (0., 0., 0.)
+                operations[operation] = {
+                    "count": self._counts[operation],
+                    "errors": self._errors[operation],
+                    "p50_ms": float(p50),
+                    "p90_ms": float(p90),
+                    "p99_ms": float(p99),
+                    "max_ms": float(values.max()) if len(values) else 0.,
+                }
+            return {
+                "operations": operations,
+                "rejected": self.rejected,
+                "batches": self.batches,
+                "mean_batch_size": self.batched_requests / self.batches if self.batches else 0.,
+            }
+
+
+class RequestBatcher:
+    """Collects requests arriving within window_ms into batches.
+
+    Searches of one database with equal parameters are answered by a single
+    batched vectorization and one search_batch call per collection; writes run
+    one by one. All work happens in one dispatcher loop. The embedded index
+    client can only write from the thread that opened it, so with start=False
+    the owner of the client runs the loop itself with serve(). Requests beyond
+    max_pending are rejected with Overloaded right away.
+    """
+
+    def __init__(
+        self,
+        registry: Union[DatabaseRegistry, "ReplicaRegistry"],
+        window_ms: float = BATCH_WINDOW_MS,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        max_pending: int = MAX_PENDING_REQUESTS,
+        start: bool = True,
+    ) -> None:
+        self._registry = registry
+        self._window = window_ms / 1000
+        self._max_batch_size = max_batch_size
+        self._queue: "Queue[Optional[Request]]" = Queue(maxsize=max_pending)
+        self.stats = LatencyStats()
+
+        self._handlers: Dict[str, Callable[[QdrantDatabase, List[Request]], List[Any]]] = {
+            "search": self._search,
+            "search_similar": self._search_similar,
+            "suggest": self._suggest,
+            "select": self._select,
+            "add": self._add,
+            "update": self._update,
+            "delete": self._delete,
+            "delete_by_filter": self._delete_by_filter,
+            "compact": self._compact,
+            "publish": self._publish,
+        }
+        self._thread: Optional[threading.Thread] = None
+        if start:
+            self._thread = threading.Thread(target=self.serve, name="batcher", daemon=True)
+            self._thread.start()
+
+    @property
+    def operations(self) -> List[str]:
+        return list(self._handlers)
+
+    def submit(self, database: str, operation: str, payload: Dict, timeout: Optional[float] = None) -> Any:
+        if operation not in self._handlers:
+            raise ValueError(f"Unknown operation '{operation}'")
+        request = Request(database=database, operation=operation, payload=payload)
+        if operation in INLINE_OPERATIONS:
+            return self._execute_inline(request)
+        try:
+            self._queue.put_nowait(request)
+        except Full:
+            self.stats.record_rejected()
+            raise Overloaded("Too many pending requests")
+
+        if not request.done.wait(timeout):
+            raise TimeoutError("Request was not processed in time")
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _execute_inline(self, request: Request) -> Any:
+        try:
+            return self._handlers[request.operation](self._registry.get(request.database), [request])[0]
+        except Exception as error:
+            request.error = error
+            raise
+        finally:
+            self.stats.record(
+                request.operation,
+                time.perf_counter() - request.created,
+                failed=request.error is not None,
+            )
+
+    def close(self) -> None:
+        # Stops the dispatcher loop after the requests already queued
+        self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join()
+
+    def serve(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.perf_counter() + self._window
+            while len(batch) < self._max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except Empty:
+                    break
+                if request is None:
+                    self._execute(batch)
+                    return
+                batch.append(request)
+            self._execute(batch)
+
+    def _execute(self, batch: List[Request]) -> None:
+        self.stats.record_batch(len(batch))
+        # Searches are only grouped between writes, so every search sees all
+        # writes sent before it
+        groups: Dict[Tuple, List[Request]] = {}
+        writes = 0
+        for request in batch:
+            key = self._group_key(request)
+            if request.operation in ("search", "search_similar"):
+                key += (writes,)
+            else:
+                writes += 1
+            groups.setdefault(key, []).append(request)
+
+        for (database_name, operation, *_), requests in groups.items():
+            try:
+                database = self._registry.get(database_name)
+                results = self._handlers[operation](database, requests)
+                for request, result in zip(requests, results):
+                    request.result = result
+            except Exception as error:
+                for request in requests:
+                    request.error = error
+            finally:
+                finished = time.perf_counter()
+                for request in requests:
+                    self.stats.record(operation, finished - request.created, failed=request.error is not None)
+                    request.done.set()
+
+    @staticmethod
+    def _group_key(request: Request) -> Tuple:
+        payload = request.payload
+        if request.operation == "search":
+            return request.database, request.operation, payload.get("limit", 5), RequestBatcher._filter_key(payload)
+        if request.operation == "search_similar":
+            return (
+                request.database,
+                request.operation,
+                payload.get("limit", 5),
+                RequestBatcher._filter_key(payload),
+                payload.get("score_threshold", SIMILARITY_THRESHOLD),
+            )
+        return request.database, request.operation, id(request)
+
+    @staticmethod
+    def _filter_key(payload: Dict) -> Optional[str]:
+        # Only searches with equal filter conditions share a batch
+        if payload.get("filter") is None:
+            return None
+        return json.dumps(payload["filter"], sort_keys=True)
+
+    @staticmethod
+    def _search(database: QdrantDatabase, requests: List[Request]) -> List[Any]:
+        return database.search_many(
+            queries=[request.payload["query"] for request in requests],
+            limit=requests[0].payload.get("limit", 5),
+            query_filter=requests[0].payload.get("filter"),
+        )
+
+    @staticmethod
+    def _search_similar(database: QdrantDatabase, requests: List[Request]) -> List[Any]:
+        return database.search_similar_many(
+            queries=[request.payload["query"] for request in requests],
+            limit=requests[0].payload.get("limit", 5),
+            score_threshold=requests[0].payload.get("score_threshold", SIMILARITY_THRESHOLD),
+            query_filter=requests[0].payload.get("filter"),
+        )
+
+    @staticmethod
+    def _suggest(database: QdrantDatabase, requests: List[Request]) -> List[Any]:
+        return [database.suggest(request.payload["prefix"], limit=request.payload.get("limit", 5)) for request in requests]
+
+    @staticmethod
+    def _select(database: QdrantDatabase, requests: List[Request]) -> List[Any]:
+        return [database.record_selection(request.payload["id"]) for request in requests]
+
+    @staticmethod
+    def _add(database: QdrantDatabase, requests: List[Request]) -> List[Any]:
+        return [database.add_vectors(request.payload["items"]) for request in requests]
+
+    @staticmethod
+    def _update(database: QdrantDatabase, requests: List[Request]) -> List[Any]:
+        return [database.update_vectors(request.payload["items"]) for request in requests]
+
+    @staticmethod
+    def _delete(database: QdrantDatabase, requests: List[Request]) -> List[Any]:
+        return [
+            database.delete_vectors(request.payload["ids"], soft=request.payload.get("soft", False))
+            for request in requests
+        ]
+
+    @staticmethod
+    def _delete_by_filter(database: QdrantDatabase, requests: List[Request]) -> List[Any]:
+        return [
+            database.delete_by_filter(request.payload["filter"], soft=request.payload.get("soft", False))
+            for request in requests
+        ]
+
+    @staticmethod
+    def _compact(database: QdrantDatabase, requests: List[Request]) -> List[Any]:
+        return [database.compact() for _ in requests]
+
+    @staticmethod
+    def _publish(database: QdrantDatabase, requests: List[Request]) -> List[Any]:
+        return [database.publish_snapshot() for _ in requests]
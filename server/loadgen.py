@@ -0,0 +1,110 @@
+import json
+import time
+import random
+import argparse
+import threading
+import urllib.error
+import urllib.request
+
+import numpy as np
+
+from typing import Dict, List
+
+
+class LoadGenerator:
+    """Sends search requests from several threads and measures client-side latency."""
+
+    def __init__(
+        self,
+        url: str,
+        database: str,
+        queries: List[str],
+        operation: str = "search",
+        limit: int = 5,
+    ) -> None:
+        self._url = f"{url.rstrip('/')}/{operation}"
+        self._database = database
+        self._queries = queries
+        self._limit = limit
+        self._latencies: List[float] = []
+        self._statuses: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def run(self, requests: int, concurrency: int) -> Dict:
+        counter = iter(range(requests))
+        counter_lock = threading.Lock()
+
+        def worker() -> None:
+            generator = random.Random()
+            while True:
+                with counter_lock:
+                    if next(counter, None) is None:
+                        return
+                self._send(generator.choice(self._queries))
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self._report(time.perf_counter() - started)
+
+    def _send(self, query: str) -> None:
+        body = json.dumps({"database": self._database, "query": query, "limit": self._limit}).encode("utf-8")
+        request = urllib.request.Request(self._url, data=body, headers={"Content-Type": "application/json"})
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as error:
+            status = error.code
+        except urllib.error.URLError:
+            status = 0
+        latency = time.perf_counter() - started
+        with self._lock:
+            self._statuses[status] = self._statuses.get(status, 0) + 1
+            if status == 200:
+                self._latencies.append(latency)
+
+    def _report(self, elapsed: float) -> Dict:
+        latencies = np.array(self._latencies) * 1000
+        p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) if len(latencies) else (0., 0., 0.)
+        return {
+            "requests": sum(self._statuses.values()),
+            "statuses": self._statuses,
+            "elapsed_s": elapsed,
+            "throughput_rps": len(latencies) / elapsed if elapsed else 0.,
+            "p50_ms": float(p50),
+            "p90_ms": float(p90),
+            "p99_ms": float(p99),
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load generator for the local search server")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--database", required=True)
+    parser.add_argument("--queries", required=True, help="Text file with one query per line")
+    parser.add_argument("--operation", default="search", choices=("search", "search_similar"))
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--limit", type=int, default=5)
+    args = parser.parse_args()
+
+    with open(args.queries, "r", encoding="utf-8") as file:
+        queries = [line.strip() for line in file if line.strip()]
+
+    generator = LoadGenerator(
+        url=args.url,
+        database=args.database,
+        queries=queries,
+        operation=args.operation,
+        limit=args.limit,
+    )
+    print(json.dumps(generator.run(requests=args.requests, concurrency=args.concurrency), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import json
+import time
+import queue
+import inspect
+import argparse
+import threading
+
+import numpy as np
+
+from typing import Dict, List, Optional
+
+from database.qdrant import QdrantDatabase, SingletonQdrant
+from database.querylog import QueryLogger, restore_params
+from database.registry import DatabaseRegistry
+
+REPLAY_OPERATIONS = ("search", "search_similar")
+
+
+class QueryReplayer:
+    """Replays logged queries against a database in process, open loop.
+
+    A scheduler hands every query to workers at its due time, either at a fixed
+    rate or at the logged timestamps, and does not wait for answers. Latency is
+    counted from the due time, so a slow response also charges the queries
+    queued behind it instead of hiding them (coordinated omission).
+    """
+
+    def __init__(self, database: QdrantDatabase, records: List[Dict]) -> None:
+        self._database = database
+        self._records = [record for record in records if record["op"] in REPLAY_OPERATIONS]
+        self._latencies: List[Optional[float]] = [None] * len(self._records)
+        self._lags: List[float] = [0.] * len(self._records)
+        self._results: List[Optional[List]] = [None] * len(self._records)
+        self._errors = 0
+        self._lock = threading.Lock()
+
+    def run(self, rate: Optional[float] = None, concurrency: int = 8, speed: float = 1.) -> Dict:
+        schedule = self._schedule(rate, speed)
+        jobs: "queue.Queue" = queue.Queue()
+        cache_before = getattr(self._database, "cache_stats", None)
+
+        threads = [threading.Thread(target=self._worker, args=(jobs,), daemon=True) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        started = time.perf_counter()
+        for position, offset in enumerate(schedule):
+            delay = started + offset - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            jobs.put((position, started + offset))
+        for _ in threads:
+            jobs.put(None)
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        report = self._report(elapsed)
+        cache_after = getattr(self._database, "cache_stats", None)
+        if cache_before is not None and cache_after is not None:
+            hits = cache_after["hits"] - cache_before["hits"]
+            misses = cache_after["misses"] - cache_before["misses"]
+            report["answer_cache_hit_ratio"] = hits / (hits + misses) if hits + misses else 0.
+        return report
+
+    def compare(self, baseline: List[Optional[List]]) -> Dict:
+        # Positions without a baseline or with a failed replay are skipped
+        exact, overlaps, compared = 0, [], 0
+        for ids, expected in zip(self._results, baseline):
+            if ids is None or expected is None:
+                continue
+            compared += 1
+            exact += ids == expected
+            overlaps.append(len(set(ids) & set(expected)) / len(expected) if expected else float(not ids))
+        return {
+            "compared": compared,
+            "exact_match_ratio": exact / compared if compared else 0.,
+            "mean_overlap": float(np.mean(overlaps)) if overlaps else 0.,
+            "changed": compared - exact,
+        }
+
+    def logged_results(self) -> List[List]:
+        return [record.get("ids") for record in self._records]
+
+    def save_results(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as file:
+            for position, (record, ids) in enumerate(zip(self._records, self._results)):
+                file.write(json.dumps(
+                    {"i": position, "op": record["op"], "q": record["q"], "ids": ids},
+                    ensure_ascii=False,
+                ) + "\n")
+
+    @staticmethod
+    def load_results(path: str) -> List[Optional[List]]:
+        results = {record["i"]: record["ids"] for record in QueryLogger.read(path)}
+        return [results.get(position) for position in range(max(results, default=-1) + 1)]
+
+    def _schedule(self, rate: Optional[float], speed: float) -> List[float]:
+        # Offsets in seconds from the start of the run
+        if rate:
+            return [position / rate for position in range(len(self._records))]
+        if not self._records:
+            return []
+        first = self._records[0]["ts"]
+        return [max(record["ts"] - first, 0.) / speed for record in self._records]
+
+    def _worker(self, jobs: "queue.Queue") -> None:
+        while True:
+            job = jobs.get()
+            if job is None:
+                return
+            position, due = job
+            self._lags[position] = time.perf_counter() - due
+            record = self._records[position]
+            try:
+                hits = self._call(record)
+            except Exception:
+                with self._lock:
+                    self._errors += 1
+                continue
+            self._latencies[position] = time.perf_counter() - due
+            self._results[position] = [hit.id for hit in hits]
+
+    def _call(self, record: Dict) -> List:
+        method = getattr(self._database, record["op"])
+        accepted = inspect.signature(method).parameters
+        params = {key: value for key, value in restore_params(record.get("p", {})).items() if key in accepted}
+        return method(record["q"], **params)
+
+    def _report(self, elapsed: float) -> Dict:
+        latencies = np.array([latency for latency in self._latencies if latency is not None]) * 1000
+        p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) if len(latencies) else (0., 0., 0.)
+        queries = [(record["op"], record["q"]) for record in self._records]
+        return {
+            "requests": len(self._records),
+            "errors": self._errors,
+            "elapsed_s": elapsed,
+            "throughput_rps": len(latencies) / elapsed if elapsed else 0.,
+            "p50_ms": float(p50),
+            "p90_ms": float(p90),
+            "p99_ms": float(p99),
+            "max_ms": float(latencies.max()) if len(latencies) else 0.,
+            "max_lag_ms": max(self._lags, default=0.) * 1000,
+            "repeated_query_ratio": 1 - len(set(queries)) / len(queries) if queries else 0.,
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replays a query log against a database")
+    parser.add_argument("--path", required=True, help="Vector index folder")
+    parser.add_argument(
+        "--database",
+        required=True,
+        help="Database to replay against: 'name' or 'name:questions_collection:answers_collection' for FAQ",
+    )
+    parser.add_argument("--log", required=True, help="Query log written by the server with --query-log")
+    parser.add_argument("--rate", type=float, help="Queries per second, logged timestamps are used if omitted")
+    parser.add_argument("--speed", type=float, default=1., help="Speed-up of logged timestamps")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--baseline", help="Results of a previous replay, logged result ids are used if omitted")
+    parser.add_argument("--output", help="File to write result ids of this replay to")
+    args = parser.parse_args()
+
+    name, *collections = args.database.split(":")
+    if collections and len(collections) != 2:
+        raise SystemExit(f"FAQ database spec must be 'name:questions:answers', got '{args.database}'")
+    registry = DatabaseRegistry(index=SingletonQdrant(path=args.path))
+    registry.register(name, *collections)
+    records = [record for record in QueryLogger.read(args.log) if record["db"] == name]
+
+    replayer = QueryReplayer(database=registry.get(name), records=records)
+    report = replayer.run(rate=args.rate, concurrency=args.concurrency, speed=args.speed)
+    baseline = QueryReplayer.load_results(args.baseline) if args.baseline else replayer.logged_results()
+    report["diff"] = replayer.compare(baseline)
+    if args.output:
+        replayer.save_results(args.output)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
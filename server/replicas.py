@@ -0,0 +1,136 @@
+import os
+import argparse
+import threading
+import multiprocessing
+
+from typing import Callable, Dict, List, Optional
+
+from embedder.base import BaseVectorizer
+from embedder.tfidf import TfIdf
+from preprocessor.lemmatizer import Lemmatizer
+from database.snapshot import SnapshotReplica
+from server.app import SearchServer
+from server.batcher import RequestBatcher
+
+from utils import BATCH_WINDOW_MS, MAX_BATCH_SIZE, MAX_PENDING_REQUESTS, SNAPSHOT_REFRESH_INTERVAL
+
+
+class ReplicaRegistry:
+    """Read-only counterpart of DatabaseRegistry: serves the latest published
+    snapshot of every database. A background thread checks for a newer
+    generation every refresh_interval seconds and loads it off the request
+    path; requests use the old generation until the reference is swapped."""
+
+    def __init__(
+        self,
+        path: str,
+        model_factory: Callable[[], BaseVectorizer] = TfIdf,
+        refresh_interval: float = SNAPSHOT_REFRESH_INTERVAL,
+        lemmatizer: Optional[Lemmatizer] = None,
+    ) -> None:
+        self._path = path
+        self._model_factory = model_factory
+        self._refresh_interval = refresh_interval
+        self._lemmatizer = lemmatizer if lemmatizer is not None else Lemmatizer()
+        self._replicas: Dict[str, SnapshotReplica] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._refresher: Optional[threading.Thread] = None
+        if refresh_interval > 0:
+            self._refresher = threading.Thread(target=self._refresh_loop, name="replica-refresh", daemon=True)
+            self._refresher.start()
+
+    def get(self, name: str) -> SnapshotReplica:
+        replica = self._replicas.get(name)
+        if replica is not None:
+            return replica
+        with self._lock:
+            replica = self._replicas.get(name)
+            if replica is None:
+                replica = SnapshotReplica(
+                    path=os.path.join(self._path, name),
+                    model_factory=self._model_factory,
+                    lemmatizer=self._lemmatizer,
+                )
+                self._replicas[name] = replica
+            return replica
+
+    def warm(self, names: List[str]) -> None:
+        for name in names:
+            self.get(name)
+
+    @property
+    def generations(self) -> Dict[str, int]:
+        return {name: replica.generation for name, replica in self._replicas.items()}
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._refresher is not None:
+            self._refresher.join()
+
+    def _refresh_loop(self) -> None:
+        while not self._stop.wait(self._refresh_interval):
+            for replica in list(self._replicas.values()):
+                try:
+                    replica.refresh()
+                except Exception:
+                    # E.g. a generation removed while loading, the next check retries
+                    pass
+
+
+def serve_worker(server: SearchServer, args: argparse.Namespace) -> None:
+    # Threads do not survive fork, so every worker starts its own batcher and refresher
+    registry = ReplicaRegistry(path=args.path, refresh_interval=args.refresh_interval)
+    registry.warm(args.database)
+    server.batcher = RequestBatcher(
+        registry=registry,
+        window_ms=args.window_ms,
+        max_batch_size=args.max_batch_size,
+        max_pending=args.max_pending,
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        registry.close()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Read-only search workers over published snapshots")
+    parser.add_argument("--path", required=True, help="Vector index folder")
+    parser.add_argument("--database", action="append", default=[], help="Database to load at startup")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--refresh-interval", type=float, default=SNAPSHOT_REFRESH_INTERVAL)
+    parser.add_argument("--window-ms", type=float, default=BATCH_WINDOW_MS)
+    parser.add_argument("--max-batch-size", type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument("--max-pending", type=int, default=MAX_PENDING_REQUESTS)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    # The listening socket is bound once and inherited by forked workers,
+    # the kernel spreads incoming connections between them
+    server = SearchServer((args.host, args.port), batcher=None)
+    context = multiprocessing.get_context("fork")
+    workers = [
+        context.Process(target=serve_worker, args=(server, args), daemon=True)
+        for _ in range(args.workers)
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import pytest
+from qdrant_client import QdrantClient
+
+from database.builders import QdrantDatabaseBuilder
+from embedder.tfidf import TfIdf
+from preprocessor.lemmatizer import Lemmatizer
+
+DOCUMENTS = [
+    {"id": 1, "text": "Статус доставки заказа можно узнать в личном кабинете", "lang": "ru"},
+    {"id": 2, "text": "Как заблокировать банковскую карту при утере", "lang": "ru"},
+    {"id": 3, "text": "Оплата картой в магазине без комиссии", "lang": "en"},
+    {"id": 4, "text": "Вернуть товар можно в течение двух недель", "lang": "ru"},
+    {"id": 5, "text": "Доставка курьером по городу занимает один день", "lang": "en"},
+    {"id": 6, "text": "Статус возврата денег приходит по почте", "lang": "ru"},
+]
+
+FAQ = [
+    {"id": 1, "title": "Где мой заказ", "description": "Статус доставки заказа есть в личном кабинете"},
+    {"id": 2, "title": "Как заблокировать карту", "description": "Карту можно заблокировать в приложении банка"},
+    {"id": 3, "title": "Как вернуть товар", "description": "Вернуть товар можно в течение двух недель"},
+    {"id": 4, "title": "Сколько стоит доставка", "description": "Доставка курьером по городу бесплатна"},
+]
+
+
+@pytest.fixture(scope="session")
+def lemmatizer():
+    return Lemmatizer()
+
+
+@pytest.fixture
+def index_path(tmp_path):
+    return str(tmp_path / "vector_db")
+
+
+@pytest.fixture
+def index(index_path):
+    # The embedded client persists to SQLite, which is bound to the thread that opened it
+    client = QdrantClient(path=index_path)
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def builder(index, lemmatizer):
+    return QdrantDatabaseBuilder(index=index, lemmatizer=lemmatizer)
+
+
+@pytest.fixture
+def documents_database(builder):
+    return builder.build_database(
+        name="documents",
+        json_items=DOCUMENTS,
+        id_field="id",
+        content_field="text",
+        collection_name="documents",
+        model=TfIdf(),
+        metadata_fields={"lang": "keyword"},
+    )
+
+
+@pytest.fixture
+def faq_database(builder):
+    return builder.build_faq_database(
+        name="faq",
+        faq_json=FAQ,
+        id_field="id",
+        question_field="title",
+        answer_field="description",
+        questions_collection_name="questions",
+        answers_collection_name="answers",
+        model=TfIdf(),
+    )
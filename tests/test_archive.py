@@ -0,0 +1,65 @@
+import tarfile
+
+import pytest
+from qdrant_client import QdrantClient
+
+from database.archive import ArchiveError
+from database.qdrant import QdrantDatabase, FAQQdrantDatabase
+from embedder.tfidf import TfIdf
+
+
+@pytest.fixture
+def target_index(tmp_path):
+    client = QdrantClient(path=str(tmp_path / "target_db"))
+    yield client
+    client.close()
+
+
+def test_documents_round_trip(documents_database, target_index, tmp_path):
+    archive_path = documents_database.export_snapshot(str(tmp_path / "documents.tar.gz"))
+
+    database = QdrantDatabase.import_snapshot(archive_path, index=target_index, model=TfIdf())
+
+    assert target_index.count("documents").count == 6
+    assert database.search("заблокировать карту", limit=1)[0].id == 2
+    assert database.search("оплата картой", limit=1, query_filter={"lang": "en"})[0].id == 3
+
+
+def test_faq_round_trip(faq_database, target_index, tmp_path):
+    archive_path = faq_database.export_snapshot(str(tmp_path / "faq.tar.gz"))
+
+    database = FAQQdrantDatabase.import_snapshot(archive_path, index=target_index, model=TfIdf())
+
+    hit = database.search("как вернуть товар", limit=1)[0]
+    assert hit.id == 3 and hit.payload["content"] == "Вернуть товар можно в течение двух недель"
+    assert [item.id for item in database.suggest("забл")] == [2]
+    assert len(database._answers_cache) == 4
+
+
+def test_import_rejects_other_kind(documents_database, target_index, tmp_path):
+    archive_path = documents_database.export_snapshot(str(tmp_path / "documents.tar.gz"))
+
+    with pytest.raises(ValueError):
+        FAQQdrantDatabase.import_snapshot(archive_path, index=target_index, model=TfIdf())
+
+
+def test_import_rejects_archive_without_header(target_index, tmp_path):
+    (tmp_path / "manifest.json").write_text("{}")
+    archive_path = str(tmp_path / "foreign.tar.gz")
+    with tarfile.open(archive_path, mode="w:gz") as archive:
+        archive.add(str(tmp_path / "manifest.json"), arcname="manifest.json")
+
+    with pytest.raises(ArchiveError):
+        QdrantDatabase.import_snapshot(archive_path, index=target_index, model=TfIdf())
+
+
+def test_import_replaces_state_of_existing_database(documents_database, index, tmp_path):
+    archive_path = documents_database.export_snapshot(str(tmp_path / "documents.tar.gz"))
+    documents_database.add_vectors([{"id": 77, "text": "Оплатить покупку картой можно на кассе"}])
+    documents_database.delete_vectors([1], soft=True)
+
+    database = QdrantDatabase.import_snapshot(archive_path, index=index, model=TfIdf())
+
+    assert 77 not in database._minhash
+    assert database.deleted_count == 0
+    assert index.count("documents").count == 6
@@ -0,0 +1,67 @@
+from qdrant_client import QdrantClient
+
+from database.qdrant import QdrantDatabase, FAQQdrantDatabase
+from embedder.tfidf import TfIdf
+
+
+def test_build_database_on_local_index(documents_database, index):
+    hits = documents_database.search("статус доставки заказа", limit=3)
+
+    assert hits[0].id == 1
+    assert index.count("documents").count == 6
+
+
+def test_build_faq_database_on_local_index(faq_database):
+    hits = faq_database.search("как заблокировать карту", limit=2)
+
+    assert hits[0].id == 2
+    assert hits[0].payload["content"] == "Карту можно заблокировать в приложении банка"
+
+
+def test_built_database_persists(documents_database, index, index_path):
+    index.close()
+    reopened = QdrantClient(path=index_path)
+    try:
+        database = QdrantDatabase.load(name="documents", index=reopened, model=TfIdf())
+        assert database.search("заблокировать карту", limit=1)[0].id == 2
+    finally:
+        reopened.close()
+
+
+def test_build_reports_stage_stats(builder, documents_database):
+    assert {"lemmatize", "checkpoint", "fit", "vectorize:documents", "upsert"} <= set(builder.pipeline_stats)
+    assert builder.pipeline_stats["upsert"].items > 0
+
+
+def test_answer_cache_counts_misses(faq_database):
+    faq_database._answer_lookups = {"hits": 0, "misses": 0}
+    hit = faq_database.search("как заблокировать карту", limit=1)[0]
+    assert faq_database.cache_stats == {"hits": 1, "misses": 0}
+
+    faq_database._answers_cache.pop(hit.id)
+    assert faq_database.search("как заблокировать карту", limit=1)[0].payload["content"] == hit.payload["content"]
+    assert faq_database.cache_stats == {"hits": 1, "misses": 1}
+    assert hit.id in faq_database._answers_cache
+
+
+def test_answer_cache_is_filled_on_load_and_bounded(faq_database, index, monkeypatch):
+    def load():
+        return FAQQdrantDatabase.load(
+            name="faq",
+            index=index,
+            model=TfIdf(),
+            questions_collection_name="questions",
+            answers_collection_name="answers",
+        )
+
+    database = load()
+    assert len(database._answers_cache) == 4
+    size = database.memory_size
+    database.search("как заблокировать карту", limit=1)
+    assert database.memory_size == size
+
+    monkeypatch.setattr("database.qdrant.ANSWERS_CACHE_MAX_ITEMS", 4)
+    database.add_vectors([{"id": 5, "title": "Как оплатить покупку", "description": "Картой на кассе"}])
+    assert database._answers_cache is None
+    assert database.search("как оплатить покупку", limit=1)[0].payload["content"] == "Картой на кассе"
+    assert load()._answers_cache is None
@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from database.qdrant import QdrantDatabase
+from embedder.tfidf import TfIdf
+from conftest import DOCUMENTS
+
+
+class Interrupted(Exception):
+    pass
+
+
+@pytest.fixture
+def upserts(monkeypatch):
+    # Two points per upsert and a log of upserted ids, the build can be failed at any call
+    monkeypatch.setattr("database.builders.PIPELINE_CHUNK_SIZE", 2)
+    calls = {"ids": [], "fail_at": None}
+    add_vectors = QdrantDatabase._add_vectors
+
+    def counted(self, items, collection_name=None):
+        if len(calls["ids"]) == calls["fail_at"]:
+            raise Interrupted()
+        calls["ids"].append(list(items.ids))
+        add_vectors(self, items=items, collection_name=collection_name)
+
+    monkeypatch.setattr(QdrantDatabase, "_add_vectors", counted)
+    return calls
+
+
+def build(builder, json_items):
+    return builder.build_database(
+        name="documents",
+        json_items=json_items,
+        id_field="id",
+        content_field="text",
+        collection_name="documents",
+        model=TfIdf(),
+    )
+
+
+def test_interrupted_build_resumes_from_checkpoint(builder, index, index_path, upserts):
+    checkpoint_path = index_path + "/documents.checkpoint"
+    upserts["fail_at"] = 2
+    with pytest.raises(Interrupted):
+        build(builder, DOCUMENTS)
+    assert upserts["ids"] == [[1, 2], [3, 4]]
+    assert os.path.exists(checkpoint_path)
+
+    upserts["fail_at"] = None
+    database = build(builder, DOCUMENTS)
+
+    assert upserts["ids"][2:] == [[5, 6]]
+    assert index.count("documents").count == 6
+    assert database.search("статус доставки заказа", limit=1)[0].id == 1
+    assert not os.path.exists(checkpoint_path)
+
+
+def test_changed_input_invalidates_checkpoint(builder, index, index_path, upserts):
+    upserts["fail_at"] = 1
+    with pytest.raises(Interrupted):
+        build(builder, DOCUMENTS)
+
+    upserts["fail_at"] = None
+    build(builder, DOCUMENTS[:4])
+
+    assert upserts["ids"] == [[1, 2], [1, 2], [3, 4]]
+    assert index.count("documents").count == 4
+    assert not os.path.exists(index_path + "/documents.checkpoint")
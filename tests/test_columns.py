@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from database.columns import ColumnStore, write_columns
+from database.filters import payload_matches
+
+PAYLOADS = [
+    {"content": "Статус доставки заказа", "lang": "ru", "year": 2021, "price": 9.5},
+    {"content": "Card payment", "lang": "en", "year": 2023},
+    {"content": "", "lang": "ru", "tags": ["a", "b"], "price": 12.},
+    {"content": "Возврат товара", "year": 2020, "tags": ["b"]},
+]
+IDS = [7, 3, 11, 5]
+
+
+@pytest.fixture
+def store(tmp_path):
+    write_columns(str(tmp_path), "documents", ids=IDS, vectors=np.eye(4, dtype=np.float32), payloads=PAYLOADS)
+    return ColumnStore(str(tmp_path), "documents")
+
+
+def test_points_round_trip(store):
+    assert [store.id_at(i) for i in range(len(store))] == IDS
+    assert [store.payload(i) for i in range(len(store))] == PAYLOADS
+    assert [store.position(item_id) for item_id in (11, 5, 4, "7")] == [2, 3, None, None]
+    assert isinstance(store.payload(1)["year"], int)
+
+
+@pytest.mark.parametrize("conditions", [
+    {"lang": "ru"},
+    {"lang": ["en", "de"]},
+    {"lang": None},
+    {"year": {"gte": 2021}},
+    {"year": {"gt": 2020, "lt": 2023}, "lang": "ru"},
+    {"year": [2020, 2023]},
+    {"price": {"lte": 10}},
+    {"tags": ["a", "b"]},
+    {"missing": "x"},
+    {"content": "Card payment"},
+])
+def test_mask_matches_payload_filter(store, conditions):
+    expected = [payload_matches(payload, conditions) for payload in PAYLOADS]
+
+    assert store.mask(conditions).tolist() == expected
+
+
+def test_string_ids(tmp_path):
+    ids = ["b3c1", "a7f2"]
+    write_columns(str(tmp_path), "faq", ids=ids, vectors=np.zeros((2, 3), dtype=np.float32), payloads=[{}, {}])
+    store = ColumnStore(str(tmp_path), "faq")
+
+    assert store.position("b3c1") == 0 and store.position(1) is None
+    assert store.payload(1) == {"content": ""}
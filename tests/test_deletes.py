@@ -0,0 +1,71 @@
+from qdrant_client import QdrantClient
+
+from database.qdrant import QdrantDatabase
+from database.snapshot import SnapshotReplica
+from embedder.tfidf import TfIdf
+from conftest import FAQ
+
+
+def test_delete_skips_missing_ids(documents_database, index):
+    documents_database.delete_vectors([999, 4])
+
+    assert index.count("documents").count == 5
+    assert documents_database.get_by_ids([4]) == []
+
+
+def test_faq_delete_skips_missing_ids(faq_database, index):
+    faq_database.delete_vectors([999, 2])
+
+    assert index.count("questions").count == index.count("answers").count == len(FAQ) - 1
+
+
+def test_soft_delete_survives_reload(documents_database, index, index_path, lemmatizer):
+    documents_database.delete_vectors([2], soft=True)
+    documents_database.delete_by_filter({"lang": "en"}, soft=True)
+    index.close()
+
+    reopened = QdrantClient(path=index_path)
+    try:
+        database = QdrantDatabase.load(name="documents", index=reopened, model=TfIdf(), lemmatizer=lemmatizer)
+        ids = [hit.id for hit in database.search("карта оплата доставка", limit=6)]
+        assert not {2, 3, 5} & set(ids)
+        assert database.deleted_count == 3
+
+        database.publish_snapshot()
+        replica = SnapshotReplica(path=database._path, lemmatizer=lemmatizer)
+        assert not {2, 3, 5} & {hit.id for hit in replica.search("карта оплата доставка", limit=6)}
+    finally:
+        reopened.close()
+
+
+def test_upsert_revives_soft_deleted_point_after_reload(documents_database, index, index_path):
+    documents_database.delete_vectors([2], soft=True)
+    documents_database.update_vectors([{"id": 2, "text": "Как заблокировать банковскую карту при утере"}])
+    index.close()
+
+    reopened = QdrantClient(path=index_path)
+    try:
+        database = QdrantDatabase.load(name="documents", index=reopened, model=TfIdf())
+        assert database.deleted_count == 0
+    finally:
+        reopened.close()
+
+
+def test_compact_keeps_idf_of_points_added_after_fit(documents_database, index, index_path):
+    idf = documents_database._model._idf.copy()
+    documents_database.add_vectors([{"id": 7, "text": "Статус заказа можно узнать в приложении банка"}])
+    documents_database.delete_vectors([7], soft=True)
+    documents_database.compact()
+
+    assert (documents_database._model._idf == idf).all()
+
+    documents_database.add_vectors([{"id": 8, "text": "Оплатить покупку картой можно на кассе"}])
+    index.close()
+    reopened = QdrantClient(path=index_path)
+    try:
+        database = QdrantDatabase.load(name="documents", index=reopened, model=TfIdf())
+        database.delete_vectors([8], soft=True)
+        database.compact()
+        assert (database._model._idf == idf).all()
+    finally:
+        reopened.close()
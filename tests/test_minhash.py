@@ -0,0 +1,42 @@
+from qdrant_client import QdrantClient
+
+from database.minhash import MinHashIndex
+from database.qdrant import QdrantDatabase
+from embedder.tfidf import TfIdf
+
+
+def test_similar_ignores_word_order(documents_database):
+    hits = documents_database.search_similar("в личном кабинете можно узнать статус доставки заказа", score_threshold=0.9)
+
+    assert [hit.id for hit in hits] == [1]
+
+
+def test_changes_survive_reload_without_save(documents_database, index, index_path):
+    documents_database.add_vectors([{"id": 7, "text": "Оплатить покупку картой можно на кассе"}])
+    documents_database.delete_vectors([4])
+    index.close()
+
+    reopened = QdrantClient(path=index_path)
+    try:
+        database = QdrantDatabase.load(name="documents", index=reopened, model=TfIdf())
+        assert [hit.id for hit in database.search_similar("Оплатить покупку картой можно на кассе")] == [7]
+        assert 4 not in database._minhash
+    finally:
+        reopened.close()
+
+
+def test_journal_is_replayed_and_truncated_by_save(tmp_path):
+    minhash = MinHashIndex()
+    minhash.add(1, ["статус", "доставка", "заказ"])
+    minhash.save(str(tmp_path))
+    minhash.attach(str(tmp_path))
+    minhash.add(2, ["заказ", "доставка", "статус"])
+    minhash.remove(1)
+
+    loaded = MinHashIndex.load(str(tmp_path))
+    assert 2 in loaded and 1 not in loaded
+    assert (tmp_path / "minhash.journal").exists()
+
+    loaded.save(str(tmp_path))
+    assert not (tmp_path / "minhash.journal").exists()
+    assert 2 in MinHashIndex.load(str(tmp_path))
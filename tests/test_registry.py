@@ -0,0 +1,62 @@
+import pytest
+
+from database.registry import DatabaseRegistry
+
+
+@pytest.fixture
+def create_registry(index, lemmatizer, documents_database, faq_database):
+    def create(**kwargs):
+        registry = DatabaseRegistry(index=index, lemmatizer=lemmatizer, **kwargs)
+        registry.register("documents")
+        registry.register("faq", questions_collection_name="questions", answers_collection_name="answers")
+        return registry
+
+    return create
+
+
+def test_databases_are_loaded_on_first_use(create_registry):
+    databases = create_registry()
+    assert databases.loaded == []
+
+    assert databases.get("faq").search("как заблокировать карту", limit=1)[0].id == 2
+    assert databases.loaded == ["faq"]
+    assert databases.get("faq") is databases["faq"]
+
+    with pytest.raises(KeyError):
+        databases.get("unknown")
+
+
+def test_least_recently_used_is_evicted_over_budget(create_registry):
+    sizes = create_registry()
+    sizes.get("documents")
+    documents_size = sizes.memory_usage
+    sizes.get("faq")
+    faq_size = sizes.memory_usage - documents_size
+
+    databases = create_registry(memory_budget=documents_size + faq_size - 1)
+    databases.get("documents")
+    databases.get("faq")
+    assert databases.loaded == ["faq"]
+
+    databases.get("documents")
+    assert databases.loaded == ["documents"]
+    assert databases.memory_usage == documents_size
+
+
+def test_get_refreshes_recency(create_registry):
+    databases = create_registry()
+    databases.warm(["faq", "documents"])
+    assert databases.loaded == ["faq", "documents"]
+
+    databases.get("faq")
+    assert databases.loaded == ["documents", "faq"]
+
+    databases.evict("documents")
+    assert databases.loaded == ["faq"]
+
+
+def test_database_over_budget_stays_loaded(create_registry):
+    databases = create_registry(memory_budget=1)
+    databases.warm(["documents", "faq"])
+
+    assert databases.loaded == ["faq"]
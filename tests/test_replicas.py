@@ -0,0 +1,69 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from server.app import SearchServer
+from server.batcher import RequestBatcher
+from server.replicas import ReplicaRegistry
+
+
+def wait_for(condition, timeout=5.):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_new_generation_is_loaded_in_background(documents_database, index_path, lemmatizer):
+    documents_database.publish_snapshot()
+    registry = ReplicaRegistry(path=index_path, refresh_interval=0.05, lemmatizer=lemmatizer)
+    try:
+        replica = registry.get("documents")
+        assert replica.generation == 1
+
+        documents_database.add_vectors([{"id": 7, "text": "Статус доставки заказа в личном кабинете"}])
+        documents_database.publish_snapshot()
+
+        assert wait_for(lambda: registry.get("documents").generation == 2)
+        assert 7 in [hit.id for hit in registry.get("documents").search("статус доставки заказа")]
+    finally:
+        registry.close()
+
+
+def test_select_on_replica_is_rejected_as_read_only(faq_database, index_path, lemmatizer):
+    faq_database.publish_snapshot()
+    registry = ReplicaRegistry(path=index_path, refresh_interval=0, lemmatizer=lemmatizer)
+    batcher = RequestBatcher(registry=registry)
+    server = SearchServer(("127.0.0.1", 0), batcher)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        request = urllib.request.Request(
+            f"http://127.0.0.1:{server.server_address[1]}/select",
+            data=json.dumps({"database": "faq", "id": 2}).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(request)
+        assert error.value.code == 405
+    finally:
+        server.shutdown()
+        server.server_close()
+        batcher.close()
+        registry.close()
+
+
+def test_replica_filters_on_metadata_columns(documents_database, index_path, lemmatizer):
+    documents_database.publish_snapshot()
+    registry = ReplicaRegistry(path=index_path, refresh_interval=0, lemmatizer=lemmatizer)
+    try:
+        hits = registry.get("documents").search("оплата картой", limit=6, query_filter={"lang": "en"})
+        assert sorted(hit.id for hit in hits) == [3, 5]
+        assert all(hit.payload["lang"] == "en" and hit.payload["content"] for hit in hits)
+    finally:
+        registry.close()
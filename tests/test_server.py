@@ -0,0 +1,55 @@
+import json
+import threading
+import urllib.request
+
+from database.registry import DatabaseRegistry
+from server.app import SearchServer
+from server.batcher import RequestBatcher
+
+
+def post(url, body):
+    request = urllib.request.Request(url, data=json.dumps(body).encode("utf-8"), headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())["result"]
+
+
+def serve(index, lemmatizer, database, client):
+    # Like server.app: the thread that opened the index runs the dispatcher
+    registry = DatabaseRegistry(index=index, lemmatizer=lemmatizer)
+    registry.add(database)
+    batcher = RequestBatcher(registry=registry, start=False)
+    server = SearchServer(("127.0.0.1", 0), batcher)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    results = {}
+
+    def run_client():
+        try:
+            results["value"] = client(url)
+        except Exception as error:
+            results["error"] = error
+        finally:
+            batcher.close()
+
+    threading.Thread(target=run_client, daemon=True).start()
+    try:
+        batcher.serve()
+    finally:
+        server.shutdown()
+        server.server_close()
+    if "error" in results:
+        raise results["error"]
+    return results["value"]
+
+
+def test_writes_over_http(index, lemmatizer, documents_database):
+    def client(url):
+        post(f"{url}/add", {"database": "documents", "items": [{"id": 7, "text": "Оплатить покупку картой можно на кассе"}]})
+        post(f"{url}/delete", {"database": "documents", "ids": [2]})
+        return post(f"{url}/search", {"database": "documents", "query": "оплатить покупку на кассе", "limit": 6})
+
+    hits = serve(index, lemmatizer, documents_database, client)
+
+    assert hits[0]["id"] == 7
+    assert hits[0]["payload"]["content"] == "Оплатить покупку картой можно на кассе"
+    assert 2 not in [hit["id"] for hit in hits]
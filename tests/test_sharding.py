@@ -0,0 +1,60 @@
+import threading
+
+import pytest
+from qdrant_client import QdrantClient
+
+from database.qdrant import QdrantDatabase
+from database.registry import DatabaseRegistry
+from embedder.tfidf import TfIdf
+from conftest import DOCUMENTS
+
+
+@pytest.fixture(params=["hash", "size"])
+def sharded_database(builder, request):
+    return builder.build_database(
+        name="sharded",
+        json_items=DOCUMENTS,
+        id_field="id",
+        content_field="text",
+        collection_name="sharded",
+        model=TfIdf(),
+        shard_count=2,
+        shard_strategy=request.param,
+    )
+
+
+def test_sharded_writes_and_reads(sharded_database, index):
+    assert sum(index.count(f"sharded__shard{shard}").count for shard in range(2)) == 6
+
+    sharded_database.add_vectors([{"id": 7, "text": "Оплатить покупку картой можно на кассе"}])
+    sharded_database.delete_vectors([2])
+
+    assert sharded_database.search("оплатить покупку на кассе", limit=1)[0].id == 7
+    assert sorted(item.id for item in sharded_database.get_by_ids([1, 2, 7])) == [1, 7]
+
+
+def test_eviction_stops_shard_threads(sharded_database, index, lemmatizer):
+    registry = DatabaseRegistry(index=index, lemmatizer=lemmatizer)
+    registry.add(sharded_database)
+    registry.get("sharded").search("статус заказа")
+    assert any(thread.name.startswith("sharded-shard") for thread in threading.enumerate())
+
+    registry.evict("sharded")
+
+    assert not any(thread.name.startswith("sharded-shard") for thread in threading.enumerate())
+
+
+def test_writes_after_save_survive_reload(sharded_database, index, index_path):
+    sharded_database.add_vectors([{"id": 100, "text": "Оплатить покупку картой можно на кассе"}])
+    index.close()
+
+    reopened = QdrantClient(path=index_path)
+    try:
+        database = QdrantDatabase.load(name="sharded", index=reopened, model=TfIdf())
+        assert [item.id for item in database.get_by_ids([100])] == [100]
+
+        database.delete_vectors([100])
+        assert 100 not in [hit.id for hit in database.search("оплатить покупку на кассе")]
+        assert sum(reopened.count(f"sharded__shard{shard}").count for shard in range(2)) == 6
+    finally:
+        reopened.close()
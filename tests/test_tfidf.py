@@ -0,0 +1,66 @@
+import numpy as np
+
+from embedder.tfidf import TfIdf
+
+CORPUS = [
+    ["статус", "доставка", "заказ"],
+    ["заказ", "оплата", "карта"],
+    ["карта", "блокировка", "2023"],
+    ["заказ", "возврат", "товар"],
+]
+
+
+def test_no_below_drops_rare_lemmas():
+    model = TfIdf(no_below=2)
+    model.fit(CORPUS)
+
+    assert model.vocabulary_stats["raw_vocabulary_size"] == 9
+    assert model.vocabulary_stats["vocabulary_size"] == model.embedding_size == 2
+    assert not model.transform(["статус", "доставка"]).any()
+
+
+def test_no_above_and_keep_n():
+    model = TfIdf(no_above=0.5)
+    model.fit(CORPUS)
+    assert not model.transform(["заказ"]).any()
+    assert model.transform(["карта"]).any()
+
+    model = TfIdf(keep_n=3)
+    model.fit(CORPUS)
+    assert model.embedding_size == 3
+
+
+def test_drop_numbers():
+    model = TfIdf(drop_numbers=True)
+    model.fit(CORPUS)
+
+    assert model.embedding_size == 8
+    assert not model.transform(["2023"]).any()
+
+
+def test_hash_size_fixes_embedding_size(tmp_path):
+    model = TfIdf(hash_size=64)
+    model.fit(CORPUS)
+    assert model.embedding_size == model.vocabulary_stats["embedding_size"] == 64
+    assert model.vocabulary_stats["bytes_per_vector"] == 64 * 4
+    vector = model.transform(["оплата", "карта"])
+    assert np.isclose(np.linalg.norm(vector), 1.)
+
+    model.save(str(tmp_path))
+    loaded = TfIdf()
+    loaded.load(str(tmp_path))
+    assert loaded.params["hash_size"] == 64
+    assert np.allclose(loaded.transform(["оплата", "карта"]), vector)
+
+
+def test_sparse_transform_matches_gensim():
+    model = TfIdf()
+    model.fit(CORPUS)
+    queries = [["заказ", "карта", "заказ"], ["неизвестно"], [], ["возврат", "товар", "оплата"]]
+
+    expected = np.zeros((len(queries), model.embedding_size), dtype=np.float32)
+    for row, query in enumerate(queries):
+        for term_id, weight in model._model[model._dictionary.doc2bow(query)]:
+            expected[row, term_id] = weight
+
+    assert np.allclose(model.transform_batch_sparse(queries).toarray(), expected, atol=1e-6)
@@ -0,0 +1,59 @@
+from qdrant_client import QdrantClient
+
+from database.qdrant import FAQQdrantDatabase
+from database.typeahead import PrefixIndex
+from embedder.tfidf import TfIdf
+
+QUESTIONS = [
+    (1, "Как заблокировать карту", ["как", "заблокировать", "карта"]),
+    (2, "Как оформить кредитную карту", ["как", "оформить", "кредитный", "карта"]),
+    (3, "Курс валют на сегодня", ["курс", "валюта", "на", "сегодня"]),
+    (4, "Как вернуть товар", ["как", "вернуть", "товар"]),
+]
+
+
+def test_bulk_build_matches_incremental_build():
+    bulk = PrefixIndex()
+    bulk.add_many(QUESTIONS * 10)
+    incremental = PrefixIndex()
+    for item_id, question, lemmas in QUESTIONS:
+        incremental.add(item_id, question, lemmas)
+
+    assert bulk._keys == incremental._keys
+    assert sorted(bulk._ids) == sorted(incremental._ids)
+    for prefix in ("к", "ка", "как з", "карт", "кредитн"):
+        assert bulk.complete(prefix) == incremental.complete(prefix)
+
+
+def test_selections_update_cached_short_prefixes():
+    index = PrefixIndex()
+    index.add_many(QUESTIONS)
+    assert [item[0] for item in index.complete("к", limit=1)] == [4]
+
+    index.add_weight(3, 2.)
+    assert [item[0] for item in index.complete("к", limit=1)] == [3]
+
+    index.remove(3)
+    index.add(5, "Кэшбэк по карте", ["кэшбэк", "по", "карта"])
+    index.add_weight(5)
+    assert [item[0] for item in index.complete("к", limit=2)] == [5, 4]
+
+
+def test_changes_survive_reload_without_save(faq_database, index, index_path):
+    faq_database.add_vectors([{"id": 5, "title": "Можно ли оплатить покупку картой", "description": "Да, на кассе"}])
+    faq_database.record_selection(2, 5.)
+    index.close()
+
+    reopened = QdrantClient(path=index_path)
+    try:
+        database = FAQQdrantDatabase.load(
+            name="faq",
+            index=reopened,
+            model=TfIdf(),
+            questions_collection_name="questions",
+            answers_collection_name="answers",
+        )
+        assert 5 in [hit.id for hit in database.suggest("можно")]
+        assert database.suggest("как", limit=1)[0].id == 2
+    finally:
+        reopened.close()
@@ -1,27 +1,107 @@
-from typing import List, NamedTuple
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+import numpy as np
 
 SCROLL_LIMIT = 100
+UPLOAD_BATCH_SIZE = 256
 SIMILARITY_THRESHOLD = 0.95
+REGISTRY_MEMORY_BUDGET = 512 * 1024 ** 2
+MINHASH_PERMUTATIONS = 128
+MINHASH_BANDS = 32
+SHINGLE_SIZE = 1
+CHECKPOINT_CHUNK_SIZE = 10000
+RRF_K = 60
+PIPELINE_QUEUE_SIZE = 4
+PIPELINE_CHUNK_SIZE = 256
+BATCH_WINDOW_MS = 5
+MAX_BATCH_SIZE = 64
+MAX_PENDING_REQUESTS = 1024
+LATENCY_WINDOW = 10000
+SNAPSHOTS_FOLDER = "snapshots"
+SNAPSHOT_KEEP = 2
+SNAPSHOT_REFRESH_INTERVAL = 1.
+SHARD_SUFFIX = "__shard"
+DELETE_BATCH_SIZE = 1000
+TYPEAHEAD_CACHED_PREFIX = 3
+TYPEAHEAD_CACHE_SIZE = 10
+# FAQ databases with more answers read them from payloads instead of a cache
+ANSWERS_CACHE_MAX_ITEMS = 100000
+ARCHIVE_FORMAT_VERSION = 1
+ARCHIVE_COMPRESS_LEVEL = 1
+ARCHIVE_CHUNK_SIZE = 10000
+QUERY_LOG_SAMPLE_RATE = 0.1
+QUERY_LOG_FLUSH_EVERY = 100
+VECTOR_DTYPE = np.float32
 
 
 class InfoObject(NamedTuple):
     id: int
     question: str
     answer: str
+    metadata: Optional[Dict] = None
 
 
 class InfoDocumentObject(NamedTuple):
     id: int
     content: str
+    metadata: Optional[Dict] = None
 
 
-class LemmaInfoObject(NamedTuple):
-    id: int
-    content: str
-    lemmas: List[str]
+class LemmaInfoObject:
+    __slots__ = ("id", "content", "lemmas", "metadata")
 
+    def __init__(self, id: int, content: str, lemmas: List[str], metadata: Optional[Dict] = None) -> None:
+        self.id = id
+        self.content = content
+        self.lemmas = lemmas
+        self.metadata = metadata
 
-class VectorInfoObject(NamedTuple):
-    id: int
-    content: str
-    vector: List[float]
+
+class VectorInfoObject:
+    __slots__ = ("id", "content", "vector")
+
+    def __init__(self, id: int, content: str, vector: np.ndarray) -> None:
+        self.id = id
+        self.content = content
+        self.vector = vector
+
+
+class VectorBatch:
+    """Column-wise batch of points: ids, contents, a (n, dim) float32 matrix,
+    optionally the lemmas the vectors were computed from and extra payload
+    fields of every point."""
+    __slots__ = ("ids", "contents", "vectors", "lemmas", "metadata")
+
+    def __init__(
+        self,
+        ids: List[int],
+        contents: List[str],
+        vectors: np.ndarray,
+        lemmas: Optional[List[List[str]]] = None,
+        metadata: Optional[List[Optional[Dict]]] = None,
+    ) -> None:
+        self.ids = list(ids)
+        self.contents = list(contents)
+        self.vectors = np.ascontiguousarray(vectors, dtype=VECTOR_DTYPE)
+        self.lemmas = lemmas
+        self.metadata = metadata
+
+    @classmethod
+    def empty(cls, embedding_size: int) -> "VectorBatch":
+        return cls(ids=[], contents=[], vectors=np.zeros((0, embedding_size), dtype=VECTOR_DTYPE), lemmas=[])
+
+    @property
+    def payloads(self) -> List[Dict]:
+        if self.metadata is None:
+            return [{"content": content} for content in self.contents]
+        return [
+            {**(metadata or {}), "content": content}
+            for content, metadata in zip(self.contents, self.metadata)
+        ]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __iter__(self) -> Iterator[VectorInfoObject]:
+        for item_id, content, vector in zip(self.ids, self.contents, self.vectors):
+            yield VectorInfoObject(id=item_id, content=content, vector=vector)